@@ -1,16 +1,27 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 import json
 import os
 import tempfile
 import asyncio
+import zipfile
+from io import BytesIO
 from datetime import datetime
 
-from .services.document_generator import DocumentGenerator
-from .services.minio_service import MinIOService
-from .schemas.generate_request import GenerateRequest
+from .services.document_generator import DocumentGenerator, MEDIA_TYPES
+from .services.paged_image import zip_entry
+from .services.minio_service import MinIOService, content_object_for
+from .services.render_cache import RenderCache
+from .services.download_service import DownloadService
+from .services.rasterizer import RasterError, RasterUnavailableError
+from .services.job_queue import JobQueue, QueueFullError
+from .services.startup import StartupTracker
+from .services.profiler import RequestProfiler, ProfilingError, server_timing
+from .services import metrics
+from .schemas.generate_request import GenerateRequest, BatchGenerateRequest, PresignRequest
 from .templates.template_manager import TemplateManager
 
 app = FastAPI(
@@ -19,95 +30,584 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Inicializar serviços
-document_generator = DocumentGenerator()
-minio_service = MinIOService()
-template_manager = TemplateManager()
+# Inicializar serviços (construção leve; o aquecimento roda em segundo plano)
+startup = StartupTracker()
+with startup.phase("services"):
+    template_manager = TemplateManager()
+    document_generator = DocumentGenerator(template_manager=template_manager)
+    minio_service = MinIOService()
+    render_cache = RenderCache(templates_dir=template_manager.templates_dir)
+    request_profiler = RequestProfiler()
+    download_service = DownloadService(MEDIA_TYPES)
+
+# Limite superior de documentos renderizados em paralelo por lote
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+async def _run_job(payload: Dict[str, Any], report_progress: Callable[[int, str], None]) -> Dict[str, Any]:
+    """Executa um job da fila com o mesmo fluxo do POST /generate"""
+    return await _generate(GenerateRequest(**payload), report_progress)
+
+job_queue = JobQueue(handler=_run_job)
+
+# Contadores dos caches e da fila expostos em /metrics
+metrics.register_stats("render_cache", render_cache.stats, counters=("hits", "misses", "evictions"))
+metrics.register_stats(
+    "image_cache",
+    document_generator.image_cache.stats,
+    counters=("memory_hits", "disk_hits", "revalidated", "downloads", "errors", "disk_evictions")
+)
+metrics.register_stats("job_queue", job_queue.stats)
+metrics.register_stats(
+    "download", download_service.stats, counters=(
+        "downloads", "not_modified", "partial", "range_not_satisfiable", "offloaded", "bytes_sent",
+        "redirects"
+    )
+)
+metrics.register_stats(
+    "temp_store", document_generator.temp_store.stats, counters=("allocated", "evictions", "evicted_bytes", "sweeps")
+)
+metrics.register_stats(
+    "minio", minio_service.stats, counters=(
+        "connections_created", "requests", "retries", "presign_cache_hits", "presign_cache_misses",
+        "uploads", "dedup_hits", "dedup_bytes_saved"
+    )
+)
+
+async def _warmup():
+    """Aquece engines, templates e workers e verifica o bucket, sem bloquear a inicialização"""
+    async def _ensure_bucket():
+        try:
+            with startup.phase("minio_bucket"):
+                await minio_service.ensure_bucket_exists()
+        except Exception as e:
+            print(f"Erro ao verificar bucket do MinIO: {e}")
+    
+    bucket_task = asyncio.create_task(_ensure_bucket())
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, document_generator.warmup, startup)
+        startup.mark_ready()
+    except Exception as e:
+        print(f"Erro no aquecimento da API: {e}")
+    await bucket_task
 
 @app.on_event("startup")
 async def startup_event():
     """Inicializar recursos na inicialização da aplicação"""
-    await minio_service.ensure_bucket_exists()
+    await job_queue.start()
+    document_generator.temp_store.start()
+    app.state.warmup_task = asyncio.create_task(_warmup())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Liberar workers de renderização"""
+    await job_queue.stop()
+    document_generator.shutdown()
 
 @app.get("/")
 async def root():
     """Endpoint de health check"""
     return {"message": "Document Generator API está funcionando!"}
 
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness: 200 somente depois que engines, templates e workers estão aquecidos
+    
+    Inclui a duração de cada fase da inicialização.
+    """
+    report = startup.report()
+    if not report["ready"]:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/templates")
 async def list_templates():
     """Lista todos os templates disponíveis"""
     templates = template_manager.list_templates()
     return {"templates": templates}
 
-@app.post("/generate")
-async def generate_document(request: GenerateRequest):
-    """
-    Gera um documento PDF ou imagem a partir de um template HTML
-    
-    - **template_name**: Nome do template (fatura, certificado)
-    - **data**: Dados para preenchimento do template
-    - **output_format**: Formato de saída (pdf, png, jpeg)
-    - **upload_to_minio**: Se deve fazer upload para o MinIO
-    """
-    try:
-        # Verificar se o template existe
-        if not template_manager.template_exists(request.template_name):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Template '{request.template_name}' não encontrado"
+def _render_options(request: GenerateRequest) -> Dict[str, Any]:
+    """Opções da requisição que afetam o documento gerado"""
+    if request.output_format == "pdf":
+        return {"sharded": True} if request.sharded else {}
+    if request.output_format in ("zip", "tiff"):
+        return {"dpi": request.dpi, "width": request.width}
+    return {"pages": request.pages, "dpi": request.dpi, "width": request.width}
+
+def _metrics_template(template_name: str) -> str:
+    """Rótulo de template das métricas: nomes inexistentes viram "unknown" (cardinalidade limitada)"""
+    return template_name if template_manager.template_exists(template_name) else "unknown"
+
+def _zip_pages(request: GenerateRequest, images: List[bytes]) -> bytes:
+    """Agrupa as imagens das páginas em um zip (sem recompressão)"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for number, content in enumerate(images, start=1):
+            archive.writestr(zip_entry(f"{request.template_name}_p{number}.{request.output_format}"), content)
+    return buffer.getvalue()
+
+async def _generate(
+    request: GenerateRequest,
+    report_progress: Optional[Callable[[int, str], None]] = None
+) -> Dict[str, Any]:
+    """Gera (ou reaproveita do cache) um documento e faz o upload se solicitado"""
+    with metrics.render_context(_metrics_template(request.template_name), request.output_format) as status:
+        with metrics.stage("validation"):
+            # Verificar se o template existe
+            if not template_manager.template_exists(request.template_name):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Template '{request.template_name}' não encontrado"
+                )
+
+            render_options = _render_options(request)
+            # Com seleção de páginas a resposta traz uma imagem por página
+            multi_page = request.pages is not None and request.output_format in ("png", "jpeg")
+
+            # Reaproveitar documento idêntico já gerado
+            cache_key = render_cache.make_key(
+                request.template_name, request.data, request.output_format, **render_options
             )
-        
-        # Gerar o documento
-        output_path = await document_generator.generate_document(
-            template_name=request.template_name,
-            data=request.data,
-            output_format=request.output_format
-        )
-        
-        result = {
-            "success": True,
-            "template_name": request.template_name,
-            "output_format": request.output_format,
-            "generated_at": datetime.now().isoformat(),
-            "local_path": output_path
-        }
-        
+            cached = render_cache.get(cache_key)
+        if cached and (cached["local_path"] or request.upload_to_minio):
+            status["cached"] = True
+            if cached["local_path"]:
+                # Reuso conta como acesso para a limpeza do temp/ (LRU)
+                document_generator.temp_store.touch(cached["local_paths"] or [cached["local_path"]])
+            result = {
+                "success": True,
+                "template_name": request.template_name,
+                "output_format": request.output_format,
+                "generated_at": datetime.fromtimestamp(cached["created_at"]).isoformat(),
+                "local_path": cached["local_path"],
+                "cached": True
+            }
+            if multi_page:
+                result["local_paths"] = cached["local_paths"]
+            if request.upload_to_minio and cached["object_name"]:
+                # Já enviado: nem upload nem bytes trafegando, só a URL (do cache de URLs)
+                object_names = cached.get("object_names") or [cached["object_name"]]
+                minio_urls = list(await asyncio.gather(*(minio_service.presign_url(name) for name in object_names)))
+                result["minio_url"] = minio_urls[0]
+                result["minio_object"] = object_names[0]
+                if multi_page:
+                    result["minio_urls"] = minio_urls
+                    result["minio_objects"] = object_names
+                result["uploaded_to_minio"] = True
+                return result
+        else:
+            # Gerar o documento
+            if report_progress:
+                report_progress(10, "rendering")
+            try:
+                if multi_page:
+                    output_paths = await document_generator.generate_pages(
+                        template_name=request.template_name,
+                        data=request.data,
+                        output_format=request.output_format,
+                        pages=request.pages,
+                        dpi=request.dpi,
+                        width=request.width
+                    )
+                    output_path = output_paths[0]
+                else:
+                    output_paths = None
+                    output_path = await document_generator.generate_document(
+                        template_name=request.template_name,
+                        data=request.data,
+                        output_format=request.output_format,
+                        dpi=request.dpi,
+                        width=request.width,
+                        sharded=request.sharded
+                    )
+            except RasterUnavailableError as e:
+                raise HTTPException(status_code=501, detail=str(e))
+            except RasterError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            render_cache.put(cache_key, output_path, local_paths=output_paths)
+            for path in output_paths or [output_path]:
+                metrics.observe_output(os.path.getsize(path))
+
+            result = {
+                "success": True,
+                "template_name": request.template_name,
+                "output_format": request.output_format,
+                "generated_at": datetime.now().isoformat(),
+                "local_path": output_path,
+                "cached": False
+            }
+            if multi_page:
+                result["local_paths"] = output_paths
+
         # Upload para MinIO se solicitado
         if request.upload_to_minio:
+            if report_progress:
+                report_progress(80, "uploading")
             try:
-                minio_url = await minio_service.upload_file(
-                    file_path=output_path,
-                    object_name=f"documents/{os.path.basename(output_path)}"
+                minio_urls = []
+                object_names = []
+                local_paths = result.get("local_paths") or [result["local_path"]]
+                for path in local_paths:
+                    # Nome pelo conteúdo: documentos idênticos são enviados uma única vez
+                    object_name, url = await minio_service.store_file(path, request.template_name)
+                    minio_urls.append(url)
+                    object_names.append(object_name)
+                if download_service.redirect_enabled:
+                    # /download/<arquivo> resolvido para o objeto em qualquer réplica
+                    await asyncio.gather(*(
+                        minio_service.put_alias(os.path.basename(path), name)
+                        for path, name in zip(local_paths, object_names)
+                    ))
+                render_cache.update_upload(
+                    cache_key, minio_urls[0], object_names[0],
+                    minio_urls if multi_page else None,
+                    object_names if multi_page else None
                 )
-                result["minio_url"] = minio_url
+                result["minio_url"] = minio_urls[0]
+                result["minio_object"] = object_names[0]
+                if multi_page:
+                    result["minio_urls"] = minio_urls
+                    result["minio_objects"] = object_names
                 result["uploaded_to_minio"] = True
             except Exception as e:
                 result["upload_error"] = str(e)
                 result["uploaded_to_minio"] = False
         else:
             result["uploaded_to_minio"] = False
-        
+
         return result
-        
+
+async def _generate_stream(request: GenerateRequest) -> Response:
+    """Gera o documento em memória e o devolve no corpo da resposta"""
+    with metrics.render_context(_metrics_template(request.template_name), request.output_format):
+        with metrics.stage("validation"):
+            if not template_manager.template_exists(request.template_name):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Template '{request.template_name}' não encontrado"
+                )
+        output_format = request.output_format
+        media_type = MEDIA_TYPES[output_format]
+        try:
+            if request.pages is not None and output_format in ("png", "jpeg"):
+                images = await document_generator.render_pages_to_bytes(
+                    template_name=request.template_name,
+                    data=request.data,
+                    output_format=output_format,
+                    pages=request.pages,
+                    dpi=request.dpi,
+                    width=request.width
+                )
+                if len(images) == 1:
+                    content = images[0]
+                else:
+                    # Várias páginas: um zip com uma imagem por página
+                    content = _zip_pages(request, images)
+                    output_format = "zip"
+                    media_type = MEDIA_TYPES["zip"]
+            else:
+                content = await document_generator.render_to_bytes(
+                    template_name=request.template_name,
+                    data=request.data,
+                    output_format=output_format,
+                    dpi=request.dpi,
+                    width=request.width,
+                    sharded=request.sharded
+                )
+        except RasterUnavailableError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        except RasterError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        metrics.observe_output(len(content))
+        filename = f"{request.template_name}.{output_format}"
+        headers = {"Content-Disposition": f'inline; filename="{filename}"'}
+    
+        # Upload direto da memória, sem arquivo intermediário
+        if request.upload_to_minio:
+            try:
+                object_name, headers["X-MinIO-URL"] = await minio_service.store_bytes(
+                    content,
+                    prefix=request.template_name,
+                    extension=output_format,
+                    content_type=media_type
+                )
+                headers["X-MinIO-Object"] = object_name
+                headers["X-Uploaded-To-MinIO"] = "true"
+            except Exception as e:
+                headers["X-Uploaded-To-MinIO"] = "false"
+                headers["X-Upload-Error"] = str(e).encode("ascii", "replace").decode("ascii")
+    
+        return Response(
+            content=content,
+            media_type=media_type,
+            headers=headers
+        )
+
+@app.post("/generate")
+async def generate_document(
+    request: GenerateRequest,
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None, description="Token de perfil (alternativa ao cabeçalho X-Profile-Token)")
+):
+    """
+    Gera um documento PDF ou imagem a partir de um template HTML
+    
+    - **template_name**: Nome do template (fatura, certificado)
+    - **data**: Dados para preenchimento do template
+    - **output_format**: Formato de saída (pdf, png, jpeg, zip, tiff)
+    - **upload_to_minio**: Se deve fazer upload para o MinIO
+    - **pages**, **dpi**, **width**: Páginas, resolução e largura das imagens (png/jpeg)
+    - **sharded**: Catálogo em PDF renderizado em partes paralelas
+    - **response_mode**: json (metadados) ou stream (o documento no corpo da resposta)
+    
+    Com o token de ``PROFILING_TOKEN`` no cabeçalho ``X-Profile-Token`` (ou em
+    ``?profile=``), a requisição é perfilada e a resposta traz o tempo de cada etapa.
+    """
+    profile_token = x_profile_token or profile
+    if profile_token is not None:
+        return await _generate_profiled(request, profile_token)
+    try:
+        if request.response_mode == "stream":
+            return await _generate_stream(request)
+        return await _generate(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao gerar documento: {str(e)}"
         )
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    """Download direto de arquivo gerado"""
-    file_path = os.path.join("temp", filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+async def _generate_profiled(request: GenerateRequest, token: str):
+    """POST /generate sob o amostrador de pilhas, com o resumo do perfil na resposta"""
+    try:
+        request_profiler.authorize(token)
+        with request_profiler.profile(f"{request.template_name}.{request.output_format}") as summary:
+            try:
+                if request.response_mode == "stream":
+                    response = await _generate_stream(request)
+                else:
+                    response = await _generate(request)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Erro ao gerar documento: {str(e)}"
+                )
+    except ProfilingError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    if isinstance(response, Response):
+        response.headers["Server-Timing"] = server_timing(summary)
+        response.headers["X-Profile-Id"] = summary["id"]
+        return response
+    return {**response, "profile": summary}
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None)
+):
+    """Perfil completo de uma requisição, no formato collapsed (flamegraph.pl, speedscope)"""
+    try:
+        request_profiler.authorize(x_profile_token or profile)
+    except ProfilingError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return FileResponse(path=path, filename=f"{profile_id}.folded", media_type="text/plain")
+
+@app.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest):
+    """
+    Gera vários documentos em paralelo e devolve os resultados em NDJSON
     
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type='application/octet-stream'
+    Cada linha corresponde a um item e é enviada assim que o item termina,
+    portanto fora da ordem original (use o campo **index**). Falhas em um item
+    não interrompem os demais. A última linha traz o resumo do lote.
+    """
+    concurrency = min(
+        request.max_concurrency or document_generator.render_concurrency,
+        BATCH_MAX_CONCURRENCY
     )
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _run(index: int, item: GenerateRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"index": index, **(await _generate(item))}
+            except HTTPException as e:
+                return {
+                    "index": index,
+                    "success": False,
+                    "template_name": item.template_name,
+                    "status_code": e.status_code,
+                    "error": e.detail
+                }
+            except Exception as e:
+                return {
+                    "index": index,
+                    "success": False,
+                    "template_name": item.template_name,
+                    "status_code": 500,
+                    "error": f"Erro ao gerar documento: {str(e)}"
+                }
+    
+    async def _stream():
+        tasks = [asyncio.create_task(_run(i, item)) for i, item in enumerate(request.items)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item_result = await next_done
+                if item_result["success"]:
+                    succeeded += 1
+                yield json.dumps(item_result, ensure_ascii=False) + "\n"
+            
+            yield json.dumps({
+                "done": True,
+                "total": len(tasks),
+                "succeeded": succeeded,
+                "failed": len(tasks) - succeeded
+            }) + "\n"
+        finally:
+            # Cliente desconectou: não continuar renderizando o restante do lote
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: GenerateRequest):
+    """
+    Enfileira a geração de um documento e retorna imediatamente o id do job
+    
+    Use **GET /jobs/{job_id}** para acompanhar status, progresso e resultado.
+    """
+    if not template_manager.template_exists(request.template_name):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Template '{request.template_name}' não encontrado"
+        )
+    
+    try:
+        job = await job_queue.submit(request.model_dump())
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progresso e resultado (local_path / minio_url) de um job"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "stage": job["stage"],
+        "template_name": job["request"]["template_name"],
+        "created_at": datetime.fromtimestamp(job["created_at"]).isoformat(),
+        "started_at": datetime.fromtimestamp(job["started_at"]).isoformat() if job["started_at"] else None,
+        "finished_at": datetime.fromtimestamp(job["finished_at"]).isoformat() if job["finished_at"] else None,
+        "result": job["result"],
+        "error": job["error"]
+    }
+
+@app.post("/documents/presign")
+async def presign_documents(request: PresignRequest):
+    """
+    URLs pré-assinadas para documentos já enviados ao MinIO, sem gerá-los de novo
+    
+    Somente objetos em ``documents/``. URLs ainda longe de expirar são
+    reaproveitadas do cache; objetos inexistentes vêm em **missing**.
+    """
+    object_names = []
+    for name in request.object_names:
+        object_name = name if name.startswith("documents/") else f"documents/{name}"
+        if ".." in object_name.split("/") or "//" in object_name or object_name == "documents/":
+            raise HTTPException(status_code=400, detail=f"Nome de objeto inválido: '{name}'")
+        if object_name not in object_names:
+            object_names.append(object_name)
+    
+    try:
+        results = await minio_service.presign_many(object_names, check_exists=request.check_exists)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Erro ao consultar o MinIO: {str(e)}")
+    
+    return {
+        "urls": [
+            {
+                "object_name": item["object_name"],
+                "url": item["url"],
+                "expires_at": datetime.fromtimestamp(item["expires_at"]).isoformat()
+            }
+            for item in results if item["url"]
+        ],
+        "missing": [item["object_name"] for item in results if not item["url"]]
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Estatísticas do cache de renderização"""
+    return render_cache.stats()
+
+async def _download_object(filename: str, local: bool) -> Optional[str]:
+    """
+    Objeto do MinIO correspondente a um nome de /download, ou None
+
+    Aceita o nome do objeto (``minio_object`` sem ``documents/``) ou o nome do
+    arquivo em temp/ (pelo apelido gravado no upload). Com o arquivo local
+    presente, só o cache de apelidos desta réplica é consultado.
+    """
+    object_name = content_object_for(filename)
+    if object_name is not None:
+        return object_name if await minio_service.object_exists(object_name) else None
+    return await minio_service.resolve_alias(filename, remote=not local)
+
+@app.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request):
+    """
+    Download direto de arquivo gerado
+
+    Com ETag/Last-Modified (304 para If-None-Match/If-Modified-Since) e Range (206/416).
+    Com DOWNLOAD_MODE=redirect, documentos no MinIO são redirecionados para a URL
+    pré-assinada; o arquivo local só é usado se não houver objeto.
+    """
+    file_path = document_generator.temp_store.resolve(filename)
+    
+    if download_service.redirect_enabled and not download_service.prefer_local(file_path):
+        try:
+            object_name = await _download_object(filename, local=file_path is not None)
+            if object_name is not None:
+                return download_service.redirect(await minio_service.presign_url(object_name))
+        except Exception as e:
+            # MinIO indisponível: o arquivo local, se houver, ainda atende
+            print(f"Erro ao resolver download no MinIO: {e}")
+    
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    
+    try:
+        return download_service.respond(request, file_path, filename)
+    except FileNotFoundError:
+        # Removido pela limpeza entre a busca e a leitura
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,7 @@
+import os
+
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Literal, Optional
+from typing import Dict, Any, List, Literal, Optional
 
 class GenerateRequest(BaseModel):
     template_name: str = Field(
@@ -20,21 +22,81 @@ class GenerateRequest(BaseModel):
             ]
         }
     )
-    output_format: Literal["pdf", "png", "jpeg"] = Field(
+    output_format: Literal["pdf", "png", "jpeg", "zip", "tiff"] = Field(
         default="pdf",
-        description="Formato de saída do documento"
+        description="Formato de saída do documento; zip (PNGs) e tiff (multipágina) trazem todas as páginas"
     )
     upload_to_minio: bool = Field(
         default=False,
         description="Se deve fazer upload do arquivo para o MinIO"
     )
+    pages: Optional[str] = Field(
+        default=None,
+        pattern=r"^\s*(all|\d+(-\d+)?(\s*,\s*\d+(-\d+)?)*)\s*$",
+        description="Páginas a rasterizar (png/jpeg), ex.: 1, 1-3, 1,4 ou all; gera uma imagem por página. Padrão: apenas a primeira",
+        example="1-2"
+    )
+    dpi: Optional[int] = Field(
+        default=None,
+        ge=24,
+        le=600,
+        description="Resolução das imagens (png/jpeg). Padrão: RASTER_DEFAULT_DPI (96)"
+    )
+    width: Optional[int] = Field(
+        default=None,
+        ge=16,
+        le=10000,
+        description="Largura das imagens em pixels (png/jpeg); tem precedência sobre dpi"
+    )
+    sharded: bool = Field(
+        default=False,
+        description="catalogo_produtos em PDF: renderiza o catálogo em partes paralelas e junta os PDFs (com marcadores e numeração de páginas)"
+    )
+    response_mode: Literal["json", "stream"] = Field(
+        default="json",
+        description="json: retorna os metadados do arquivo em temp/; stream: retorna o próprio documento no corpo da resposta, sem gravar em disco"
+    )
+
+# Documentos por chamada de /generate/batch (todos são enfileirados de uma vez)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+class BatchGenerateRequest(BaseModel):
+    items: List[GenerateRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+        description=f"Lista de documentos a gerar (até {BATCH_MAX_ITEMS})"
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Máximo de documentos renderizados em paralelo (padrão: número de workers de renderização)"
+    )
+
+class PresignRequest(BaseModel):
+    object_names: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Objetos em documents/ (com ou sem o prefixo), ex.: documents/fatura_3f2a9c0d4b1e8f7a6c5d4e3f2a1b0c9d.pdf (<template>_<sha256[:32]>.<ext>)"
+    )
+    check_exists: bool = Field(
+        default=True,
+        description="Verifica se cada objeto existe antes de assinar (objetos já assinados recentemente não são verificados)"
+    )
 
 class GenerateResponse(BaseModel):
     success: bool
     template_name: str
     output_format: str
     generated_at: str
-    local_path: str
+    local_path: Optional[str] = None
+    local_paths: Optional[List[str]] = None
     uploaded_to_minio: bool
+    cached: bool = False
     minio_url: Optional[str] = None
-    upload_error: Optional[str] = None 
\ No newline at end of file
+    minio_urls: Optional[List[str]] = None
+    minio_object: Optional[str] = None
+    minio_objects: Optional[List[str]] = None
+    upload_error: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None 
\ No newline at end of file
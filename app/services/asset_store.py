@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import stage
+from .disk_cache import DiskCacheIndex
+
+# Raiz do projeto (onde ficam public/ e app/), independente do diretório corrente
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class AssetFetchError(Exception):
+    """Recurso não pôde ser obtido; o WeasyPrint ignora o recurso e segue a renderização"""
+
+class AssetStore:
+    """
+    Resolve os recursos referenciados pelos templates durante a renderização
+
+    - Arquivos locais (ex.: ``public/logo.jpg``) são servidos da memória, e apenas
+      de dentro dos diretórios de assets do projeto.
+    - Recursos remotos são guardados em disco com TTL e limite de tamanho
+      (``ASSET_CACHE_MAX_BYTES``, os menos usados são apagados; o índice é por
+      processo); hosts inacessíveis falham rápido e não são tentados de novo
+      por um intervalo.
+
+    ``url_fetcher`` tem a assinatura esperada pelo WeasyPrint.
+    """
+
+    def __init__(
+        self,
+        asset_dirs: Optional[list] = None,
+        cache_dir: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.base_url = PROJECT_ROOT + os.sep
+        self.asset_dirs = [
+            os.path.realpath(d) for d in (
+                asset_dirs or [
+                    os.path.join(PROJECT_ROOT, "public"),
+                    os.path.join(PROJECT_ROOT, "app", "public")
+                ]
+            )
+        ]
+        self.cache_dir = cache_dir or os.getenv("ASSET_CACHE_DIR", os.path.join("temp", ".assets"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("ASSET_CACHE_TTL_SECONDS", str(24 * 3600)))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("ASSET_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+        self.connect_timeout = float(os.getenv("ASSET_CONNECT_TIMEOUT", "2"))
+        self.read_timeout = float(os.getenv("ASSET_READ_TIMEOUT", "10"))
+        self.host_retry_seconds = int(os.getenv("ASSET_HOST_RETRY_SECONDS", "300"))
+        # Em modo offline nada é buscado na rede: só assets locais e o cache em disco
+        self.offline = os.getenv("ASSET_OFFLINE", "False").lower() == "true"
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.disk = DiskCacheIndex(self.cache_dir, (".bin", ".json"), self.max_bytes)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._bundled: Dict[str, Dict[str, Any]] = {}
+        self._down_hosts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self._load_bundled()
+
+    def url_fetcher(self, url: str, timeout: int = 10, ssl_context=None) -> Dict[str, Any]:
+        """Implementação de ``url_fetcher`` para ``weasyprint.HTML``"""
+        parsed = urlparse(url)
+
+        if parsed.scheme == "file":
+            return self._fetch_local(unquote(parsed.path), url)
+        if parsed.scheme in ("http", "https"):
+            return self._fetch_remote(url, parsed.netloc)
+        if parsed.scheme == "data":
+            import weasyprint
+            return weasyprint.default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+        raise AssetFetchError(f"Esquema de URL não suportado: {url}")
+
+    def _load_bundled(self):
+        """Carrega em memória os arquivos dos diretórios de assets"""
+        for directory in self.asset_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    with open(path, "rb") as f:
+                        self._bundled[path] = {
+                            "string": f.read(),
+                            "mime_type": mimetypes.guess_type(path)[0],
+                            "redirected_url": f"file://{path}"
+                        }
+
+    def _fetch_local(self, path: str, url: str) -> Dict[str, Any]:
+        path = os.path.realpath(path)
+        asset = self._bundled.get(path)
+        if asset is not None:
+            return dict(asset)
+
+        # Somente arquivos dentro dos diretórios de assets (dados do usuário chegam aos templates)
+        if not any(path.startswith(directory + os.sep) for directory in self.asset_dirs):
+            raise AssetFetchError(f"Arquivo local fora dos diretórios de assets: {url}")
+        if not os.path.isfile(path):
+            raise AssetFetchError(f"Asset não encontrado: {url}")
+
+        with open(path, "rb") as f:
+            asset = {
+                "string": f.read(),
+                "mime_type": mimetypes.guess_type(path)[0],
+                "redirected_url": f"file://{path}"
+            }
+        with self._lock:
+            self._bundled[path] = asset
+        return dict(asset)
+
+    def _fetch_remote(self, url: str, host: str) -> Dict[str, Any]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        content, meta = self._disk_get(key)
+
+        if content is not None and (self.offline or time.time() - meta["fetched_at"] < self.ttl_seconds):
+            return {"string": content, "mime_type": meta.get("mime_type"), "redirected_url": url}
+
+        if self.offline or self._host_down(host):
+            return self._stale_or_fail(url, content, meta, "host indisponível ou modo offline")
+
+        try:
+            with stage("image_fetch"):
+                response = self.session.get(url, timeout=(self.connect_timeout, self.read_timeout))
+            response.raise_for_status()
+        except requests.exceptions.ConnectionError as e:
+            # Host inacessível: não tentar de novo por host_retry_seconds
+            with self._lock:
+                self._down_hosts[host] = time.time() + self.host_retry_seconds
+            return self._stale_or_fail(url, content, meta, str(e))
+        except requests.exceptions.RequestException as e:
+            return self._stale_or_fail(url, content, meta, str(e))
+
+        with self._lock:
+            self._down_hosts.pop(host, None)
+        mime_type = response.headers.get("Content-Type", "").split(";")[0] or None
+        self._disk_put(key, response.content, {"url": url, "mime_type": mime_type, "fetched_at": time.time()})
+        return {"string": response.content, "mime_type": mime_type, "redirected_url": url}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"bundled_assets": len(self._bundled), "down_hosts": len(self._down_hosts)}
+        stats.update(self.disk.stats())
+        return stats
+
+    def _host_down(self, host: str) -> bool:
+        """Host ainda no intervalo de espera; os que já venceram são descartados"""
+        now = time.time()
+        with self._lock:
+            for expired in [h for h, until in self._down_hosts.items() if until <= now]:
+                del self._down_hosts[expired]
+            return host in self._down_hosts
+
+    def _stale_or_fail(self, url: str, content: Optional[bytes], meta: Optional[Dict[str, Any]], reason: str):
+        if content is not None:
+            return {"string": content, "mime_type": meta.get("mime_type"), "redirected_url": url}
+        raise AssetFetchError(f"Não foi possível obter {url}: {reason}")
+
+    def _disk_get(self, key: str):
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(self.cache_dir, f"{key}.bin"), "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None, None
+        self.disk.touch(key)
+        return content, meta
+
+    def _disk_put(self, key: str, content: bytes, meta: Dict[str, Any]):
+        try:
+            for suffix, payload in ((".bin", content), (".json", json.dumps(meta).encode("utf-8"))):
+                path = os.path.join(self.cache_dir, f"{key}{suffix}")
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Erro ao gravar asset no cache: {e}")
+            return
+        self.disk.add(key)
@@ -0,0 +1,110 @@
+import math
+from io import BytesIO
+from typing import Dict, Any, List, Union, BinaryIO
+
+def split_catalog(data: Dict[str, Any], max_products: int) -> List[Dict[str, Any]]:
+    """
+    Divide os dados de um ``catalogo_produtos`` em partes renderizáveis em paralelo
+
+    Fabricantes inteiros são agrupados até ``max_products`` produtos por parte;
+    um fabricante maior que isso é dividido em blocos, e os blocos seguintes ao
+    primeiro são marcados com ``continuacao`` (sem marcador próprio no sumário).
+    Só a primeira parte traz o cabeçalho e só a última traz o rodapé.
+    """
+    max_products = max(1, max_products)
+    shards: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    current_size = 0
+
+    for fabricante in data.get("catalogo_fabricantes", []):
+        produtos = fabricante.get("produtos", [])
+        if current and current_size + len(produtos) > max_products:
+            shards.append(current)
+            current, current_size = [], 0
+
+        if len(produtos) <= max_products:
+            current.append(fabricante)
+            current_size += len(produtos)
+            continue
+
+        for start in range(0, len(produtos), max_products):
+            chunk = {**fabricante, "produtos": produtos[start:start + max_products]}
+            if start:
+                chunk["continuacao"] = True
+            if current:
+                shards.append(current)
+            current, current_size = [chunk], len(chunk["produtos"])
+
+    if current or not shards:
+        shards.append(current)
+
+    return [
+        {
+            **data,
+            "catalogo_fabricantes": fabricantes,
+            "mostrar_cabecalho": index == 0,
+            "mostrar_rodape": index == len(shards) - 1
+        }
+        for index, fabricantes in enumerate(shards)
+    ]
+
+def shard_budget(data: Dict[str, Any], workers: int, min_products: int, max_products: int) -> int:
+    """Produtos por parte: o suficiente para ocupar todos os workers, dentro dos limites"""
+    total = sum(len(f.get("produtos", [])) for f in data.get("catalogo_fabricantes", []))
+    return max(min_products, min(max_products, math.ceil(total / max(1, workers))))
+
+class PdfPartMerger:
+    """
+    Junta PDFs parciais, na ordem em que são adicionados, em um único documento
+
+    Os marcadores (sumário) de cada parte são preservados com as páginas
+    deslocadas; ao final, a numeração "N / total" pode ser carimbada nas páginas.
+    """
+
+    def __init__(self):
+        from pypdf import PdfWriter
+
+        self.writer = PdfWriter()
+
+    def append(self, part: bytes):
+        from pypdf import PdfReader
+
+        self.writer.append(PdfReader(BytesIO(part)), import_outline=True)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.writer.pages)
+
+    def write(self, output: Union[str, BinaryIO], page_numbers: bool = True):
+        if page_numbers:
+            self._stamp_page_numbers()
+        if isinstance(output, str):
+            with open(output, "wb") as f:
+                self.writer.write(f)
+        else:
+            self.writer.write(output)
+
+    def _stamp_page_numbers(self):
+        """Carimba "N / total" no rodapé de cada página (requer ReportLab)"""
+        try:
+            from reportlab.pdfgen import canvas
+        except ImportError:
+            print("⚠️  ReportLab não disponível: PDF em partes gerado sem numeração de páginas")
+            return
+        from pypdf import PdfReader
+
+        total = self.page_count
+        buffer = BytesIO()
+        overlay = canvas.Canvas(buffer)
+        for number, page in enumerate(self.writer.pages, start=1):
+            width, height = float(page.mediabox.width), float(page.mediabox.height)
+            overlay.setPageSize((width, height))
+            overlay.setFont("Helvetica", 9)
+            overlay.setFillGray(0.45)
+            overlay.drawCentredString(width / 2, 18, f"{number} / {total}")
+            overlay.showPage()
+        overlay.save()
+
+        stamps = PdfReader(BytesIO(buffer.getvalue()))
+        for page, stamp in zip(self.writer.pages, stamps.pages):
+            page.merge_page(stamp)
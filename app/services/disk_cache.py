@@ -0,0 +1,99 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Tuple
+
+
+class DiskCacheIndex:
+    """
+    Índice de um diretório de cache em disco com limite de tamanho (LRU)
+
+    Cada entrada é um conjunto de arquivos ``<chave><sufixo>`` (ex.: conteúdo e
+    metadados). O índice guarda o tamanho e a ordem de uso das entradas; ao
+    passar de ``max_bytes``, as menos usadas são apagadas do disco. Na criação,
+    o diretório é lido e a ordem inicial vem do mtime dos arquivos.
+    """
+
+    def __init__(self, directory: str, suffixes: Iterable[str], max_bytes: int):
+        self.directory = directory
+        self.suffixes = tuple(suffixes)
+        self.max_bytes = max_bytes
+
+        # chave -> bytes da entrada, da menos para a mais usada
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        self._scan()
+
+    def touch(self, key: str):
+        """Marca a entrada como usada"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def add(self, key: str):
+        """Registra (ou atualiza) a entrada recém-gravada e aplica o limite"""
+        size = sum(size for _, size in self._files(key))
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            evicted = []
+            while len(self._entries) > 1 and self._total_bytes > self.max_bytes:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                self.evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._delete(old_key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "disk_entries": len(self._entries),
+                "disk_bytes": self._total_bytes,
+                "disk_max_bytes": self.max_bytes,
+                "disk_evictions": self.evictions
+            }
+
+    def _files(self, key: str) -> List[Tuple[str, int]]:
+        files = []
+        for suffix in self.suffixes:
+            path = os.path.join(self.directory, f"{key}{suffix}")
+            try:
+                files.append((path, os.path.getsize(path)))
+            except OSError:
+                continue
+        return files
+
+    def _delete(self, key: str):
+        for path, _ in self._files(key):
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ Erro ao remover {path} do cache em disco: {e}")
+
+    def _scan(self):
+        """Registra as entradas já em disco, das mais antigas para as mais novas"""
+        found: Dict[str, List[float]] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                suffix = next((s for s in self.suffixes if entry.name.endswith(s)), None)
+                if suffix is None:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                key = entry.name[:-len(suffix)]
+                mtime, size = found.get(key, (0.0, 0))
+                found[key] = [max(mtime, stat.st_mtime), size + stat.st_size]
+
+        with self._lock:
+            for key, (_, size) in sorted(found.items(), key=lambda item: item[1][0]):
+                self._entries[key] = size
+                self._total_bytes += size
+        if self._total_bytes > self.max_bytes and self._entries:
+            # Aplica o limite a um diretório deixado por execuções anteriores
+            self.add(next(reversed(self._entries)))
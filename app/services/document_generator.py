@@ -1,45 +1,160 @@
 import os
 import tempfile
 from datetime import datetime
-from typing import Dict, Any, Literal
+from typing import Dict, Any, List, Literal, Optional, Union, BinaryIO
 import asyncio
+import threading
+from contextlib import nullcontext
 from concurrent.futures import ThreadPoolExecutor
 import platform
-import uuid
 import subprocess
 import sys
-import requests
 from io import BytesIO
 
-from jinja2 import Environment, FileSystemLoader
 from PIL import Image, ImageDraw, ImageFont
 import base64
 
 from ..templates.template_manager import TemplateManager
+from .image_cache import ImageCache
+from .asset_store import AssetStore
+from .stylesheet_cache import StylesheetCache
+from .rasterizer import RasterError, RasterUnavailableError, rasterize_pdf, rasterizer_available, write_paged_pdf
+from .paged_image import PAGED_FORMATS, PagedCanvas, PageWriter
+from .font_registry import font_registry
+from .temp_store import TempFileStore
+from .catalog_shards import PdfPartMerger, shard_budget, split_catalog
+from .metrics import run_in_executor, set_engine, stage
+
+# Content-Type de cada formato de saída
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "zip": "application/zip",
+    "tiff": "image/tiff"
+}
+
+def process_template_data(template_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepara os dados para o template (data atual, valores formatados)
+
+    Função de módulo para poder ser usada também pelos workers do pool de processos.
+    """
+    processed_data = data.copy()
+
+    # Adicionar data atual se não fornecida
+    if "data_atual" not in processed_data:
+        processed_data["data_atual"] = datetime.now().strftime("%d/%m/%Y")
+
+    # Formatação de valores monetários
+    if "valor" in processed_data:
+        processed_data["valor_formatado"] = f"R$ {processed_data['valor']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+    if "itens" in processed_data:
+        for item in processed_data["itens"]:
+            if "valor" in item:
+                item["valor_formatado"] = f"R$ {item['valor']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+    return processed_data
 
 class DocumentGenerator:
-    def __init__(self):
-        self.template_manager = TemplateManager()
-        self.temp_dir = os.path.join(os.getcwd(), "temp")
+    def __init__(self, template_manager: Optional[TemplateManager] = None):
+        # Construção leve: engines, templates e workers são aquecidos em warmup()
+        self.template_manager = template_manager or TemplateManager()
+        # Documentos gerados: nomes únicos, cota de espaço e limpeza em segundo plano
+        self.temp_store = TempFileStore(extensions=MEDIA_TYPES)
+        self.temp_dir = self.temp_store.directory
         
-        # Criar diretório temporário se não existir
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Configurar Jinja2 (bytecode em cache; templates pré-compilados no warmup)
+        self.jinja_env = self.template_manager.create_environment()
         
-        # Configurar Jinja2
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(os.path.join("app", "templates", "html")),
-            autoescape=True
-        )
+        # Cache compartilhado das imagens de produtos dos catálogos
+        self.image_cache = ImageCache()
         
-        # Executor para operações bloqueantes
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # Recursos dos templates HTML (logo, imagens, CSS) servidos localmente ao WeasyPrint
+        self.asset_store = AssetStore()
         
-        # Verificar se WeasyPrint está disponível
-        self.weasyprint_available = self._check_weasyprint()
+        # CSS dos templates interpretado uma vez por worker, com FontConfiguration compartilhada
+        self.stylesheet_cache = StylesheetCache(self.template_manager.templates_dir, self.asset_store)
         
-        if not self.weasyprint_available:
-            print("⚠️  WeasyPrint não disponível. Usando ReportLab como alternativa.")
-            self._setup_reportlab()
+        # Executor para operações bloqueantes
+        self.max_workers = int(os.getenv("RENDER_WORKERS", "4"))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        
+        # Backend de renderização do WeasyPrint: "thread" (padrão) ou "process"
+        self.render_backend = os.getenv("RENDER_BACKEND", "thread").lower()
+        self.render_pool = None
+        
+        # Engines de PDF detectadas sob demanda (_ensure_engines)
+        self.weasyprint_available = False
+        self.reportlab_available = False
+        self.raster_available = False
+        self._engines_ready = False
+        self._engines_lock = threading.Lock()
+    
+    def warmup(self, tracker=None):
+        """
+        Aquece engines de PDF, templates e workers de renderização
+        
+        Chamado em segundo plano na inicialização da API; cada fase é medida
+        pelo tracker (StartupTracker), se informado.
+        """
+        def phase(name):
+            return tracker.phase(name) if tracker else nullcontext()
+        
+        with phase("pdf_engines"):
+            self._ensure_engines()
+        with phase("templates"):
+            self.template_manager.precompile(self.jinja_env)
+        with phase("fonts"):
+            # Descoberta das fontes do renderizador PIL fora do caminho da requisição
+            for size in (12, 16, 24, 36):
+                font_registry.font("sans", size)
+        if self.render_pool is not None:
+            with phase("render_pool"):
+                self.render_pool.warmup()
+    
+    def _ensure_engines(self):
+        """Detecta as engines de PDF uma única vez (importa e testa o WeasyPrint)"""
+        if self._engines_ready:
+            return
+        
+        with self._engines_lock:
+            if self._engines_ready:
+                return
+            
+            # Verificar se WeasyPrint está disponível
+            self.weasyprint_available = self._check_weasyprint()
+            
+            if not self.weasyprint_available:
+                print("⚠️  WeasyPrint não disponível. Usando ReportLab como alternativa.")
+                self._setup_reportlab()
+            
+            # Imagens fiéis ao template: PDF do WeasyPrint rasterizado com PDFium
+            self.raster_available = self.weasyprint_available and rasterizer_available()
+            if self.weasyprint_available and not self.raster_available:
+                print("⚠️  pypdfium2 não disponível. Imagens serão geradas diretamente com PIL.")
+            
+            if self.weasyprint_available and self.render_backend == "process":
+                from .render_pool import RenderPool
+                self.render_pool = RenderPool(templates_dir=self.template_manager.templates_dir)
+                print(f"Renderização de PDF em pool de processos ({self.render_pool.max_workers} workers)")
+            
+            self._engines_ready = True
+    
+    @property
+    def render_concurrency(self) -> int:
+        """Quantos documentos podem ser renderizados em paralelo de fato"""
+        if self.render_pool is not None:
+            return self.render_pool.max_workers
+        return self.max_workers
+    
+    def shutdown(self):
+        """Libera executores e processos de renderização"""
+        self.temp_store.stop()
+        if self.render_pool is not None:
+            self.render_pool.shutdown()
+        self.executor.shutdown(wait=False)
     
     def _check_weasyprint(self) -> bool:
         """Verifica se WeasyPrint está disponível e funcionando"""
@@ -70,7 +185,10 @@ class DocumentGenerator:
         self, 
         template_name: str, 
         data: Dict[str, Any], 
-        output_format: Literal["pdf", "png", "jpeg"]
+        output_format: Literal["pdf", "png", "jpeg", "zip", "tiff"],
+        dpi: Optional[int] = None,
+        width: Optional[int] = None,
+        sharded: bool = False
     ) -> str:
         """
         Gera um documento a partir de um template HTML
@@ -78,85 +196,307 @@ class DocumentGenerator:
         Args:
             template_name: Nome do template
             data: Dados para preenchimento
-            output_format: Formato de saída (pdf, png, jpeg)
+            output_format: Formato de saída (pdf, png, jpeg; zip/tiff com uma imagem por página)
+            dpi: Resolução das imagens
+            width: Largura das imagens em pixels; tem precedência sobre dpi
+            sharded: Catálogos em PDF: renderizar em partes paralelas e juntá-las
             
         Returns:
-            Caminho do arquivo gerado
+            Caminho do arquivo gerado (para imagens, a primeira página)
         """
+        output_path = self.temp_store.allocate(template_name, output_format)[0]
         try:
-            # Gerar nome único para o arquivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{template_name}_{timestamp}.{output_format}"
-            output_path = os.path.join(self.temp_dir, filename)
+            await self._render(template_name, data, output_format, output_path, dpi=dpi, width=width, sharded=sharded)
+            self.temp_store.commit([output_path])
+            return output_path
             
-            if output_format == "pdf":
-                if self.weasyprint_available:
-                    await self._generate_pdf_weasyprint(template_name, data, output_path)
-                elif hasattr(self, 'reportlab_available') and self.reportlab_available:
-                    await self._generate_pdf_reportlab(template_name, data, output_path)
-                else:
-                    raise Exception("Nenhuma engine de PDF disponível. Instale WeasyPrint ou ReportLab.")
-            else:
-                # Para imagens, usar geração direta sem depender de Poppler
-                if output_format in ["png", "jpeg"]:
-                    await self._generate_image_direct(template_name, data, output_path, output_format)
+        except RasterError:
+            self.temp_store.discard([output_path])
+            raise
+        except Exception as e:
+            self.temp_store.discard([output_path])
+            raise Exception(f"Erro ao gerar documento: {str(e)}")
+    
+    async def generate_pages(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        output_format: Literal["png", "jpeg"],
+        pages: Optional[str] = "1",
+        dpi: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> List[str]:
+        """
+        Gera uma imagem por página selecionada do documento
+        
+        Args:
+            pages: Seleção de páginas, ex.: "1", "1-3", "1,4", "all"
             
-            return output_path
+        Returns:
+            Caminhos dos arquivos gerados, um por página (``<nome>_p<N>.<formato>``)
+        """
+        try:
+            images = await self.render_pages_to_bytes(template_name, data, output_format, pages, dpi, width)
+            
+            paths = self.temp_store.allocate(template_name, output_format, pages=len(images))
+            try:
+                for path, content in zip(paths, images):
+                    with open(path, "wb") as f:
+                        f.write(content)
+            except Exception:
+                self.temp_store.discard(paths)
+                raise
+            self.temp_store.commit(paths)
+            return paths
             
+        except RasterError:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao gerar documento: {str(e)}")
     
-    async def _generate_image_direct(self, template_name: str, data: Dict[str, Any], output_path: str, format: str):
-        """Gera imagem diretamente usando PIL (sem precisar de PDF intermediário)"""
+    async def render_to_bytes(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        output_format: Literal["pdf", "png", "jpeg", "zip", "tiff"],
+        dpi: Optional[int] = None,
+        width: Optional[int] = None,
+        sharded: bool = False
+    ) -> bytes:
+        """
+        Gera um documento inteiramente em memória, sem gravar em temp/
+        
+        Returns:
+            Conteúdo do documento gerado
+        """
+        try:
+            buffer = BytesIO()
+            await self._render(template_name, data, output_format, buffer, dpi=dpi, width=width, sharded=sharded)
+            return buffer.getvalue()
+            
+        except RasterError:
+            raise
+        except Exception as e:
+            raise Exception(f"Erro ao gerar documento: {str(e)}")
+    
+    async def render_pages_to_bytes(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        output_format: Literal["png", "jpeg"],
+        pages: Optional[str] = "1",
+        dpi: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> List[bytes]:
+        """Rasteriza as páginas selecionadas em memória, uma imagem por página"""
+        await self._ensure_engines_async()
+        if not self.raster_available:
+            raise RasterUnavailableError("Seleção de páginas requer WeasyPrint e pypdfium2 instalados")
+        return await self._rasterize(template_name, data, output_format, pages, dpi, width)
+    
+    async def _ensure_engines_async(self):
+        if not self._engines_ready:
+            # Requisição chegou antes do warmup terminar
+            await run_in_executor(self.executor, "render", self._ensure_engines)
+    
+    async def _render(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        output_format: str, 
+        output: Union[str, BinaryIO],
+        dpi: Optional[int] = None,
+        width: Optional[int] = None,
+        sharded: bool = False
+    ):
+        """Escolhe a engine e grava o documento em um caminho ou buffer"""
+        await self._ensure_engines_async()
+        
+        if output_format == "pdf":
+            set_engine("weasyprint" if self.weasyprint_available else "reportlab")
+            if sharded and template_name == "catalogo_produtos":
+                await self._generate_catalog_sharded(template_name, data, output)
+            elif self.weasyprint_available:
+                await self._generate_pdf_weasyprint(template_name, data, output)
+            elif self.reportlab_available:
+                await self._generate_pdf_reportlab(template_name, data, output)
+            else:
+                raise Exception("Nenhuma engine de PDF disponível. Instale WeasyPrint ou ReportLab.")
+        elif output_format in ["png", "jpeg"]:
+            set_engine("pdfium" if self.raster_available else "pil")
+            if self.raster_available:
+                images = await self._rasterize(template_name, data, output_format, "1", dpi, width)
+                if isinstance(output, str):
+                    with open(output, "wb") as f:
+                        f.write(images[0])
+                else:
+                    output.write(images[0])
+            else:
+                # Sem WeasyPrint/PDFium: aproximação desenhada diretamente com PIL
+                await self._generate_image_direct(template_name, data, output, output_format)
+        elif output_format in PAGED_FORMATS:
+            # Todas as páginas, uma imagem por página (zip de PNGs ou TIFF multipágina)
+            set_engine("pdfium" if self.raster_available else "pil")
+            if self.raster_available:
+                await self._rasterize_paged(template_name, data, output_format, output, dpi, width)
+            else:
+                await self._generate_image_direct(template_name, data, output, output_format)
+        else:
+            raise Exception(f"Formato de saída não suportado: {output_format}")
+    
+    async def _generate_catalog_sharded(self, template_name: str, data: Dict[str, Any], output: Union[str, BinaryIO]):
+        """
+        Renderiza um catálogo em partes paralelas e junta os PDFs
+        
+        As partes são renderizadas pelos workers (com RENDER_BACKEND=process, um
+        núcleo por parte) e anexadas ao documento final na ordem do catálogo, à
+        medida que ficam prontas. Marcadores de cada fabricante são preservados e
+        a numeração de páginas é aplicada ao documento inteiro.
+        """
+        budget = shard_budget(
+            data,
+            self.render_concurrency,
+            int(os.getenv("CATALOG_SHARD_MIN_PRODUCTS", "50")),
+            int(os.getenv("CATALOG_SHARD_MAX_PRODUCTS", "400"))
+        )
+        shards = split_catalog(data, budget)
+        page_numbers = os.getenv("CATALOG_SHARD_PAGE_NUMBERS", "True").lower() == "true"
+        semaphore = asyncio.Semaphore(self.render_concurrency)
+        
+        async def _render_shard(shard_data: Dict[str, Any]) -> bytes:
+            async with semaphore:
+                buffer = BytesIO()
+                if self.weasyprint_available:
+                    await self._generate_pdf_weasyprint(template_name, shard_data, buffer)
+                elif self.reportlab_available:
+                    await self._generate_pdf_reportlab(template_name, shard_data, buffer)
+                else:
+                    raise Exception("Nenhuma engine de PDF disponível. Instale WeasyPrint ou ReportLab.")
+                return buffer.getvalue()
+        
+        def _merge_part(merger: PdfPartMerger, part: bytes):
+            with stage("merge"):
+                merger.append(part)
+        
+        def _write_merged(merger: PdfPartMerger):
+            with stage("write"):
+                merger.write(output, page_numbers)
+        
+        tasks = [asyncio.create_task(_render_shard(shard)) for shard in shards]
+        try:
+            merger = PdfPartMerger()
+            for task in tasks:
+                part = await task
+                await run_in_executor(self.executor, "render", _merge_part, merger, part)
+            await run_in_executor(self.executor, "render", _write_merged, merger)
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        print(f"Catálogo renderizado em {len(shards)} partes ({merger.page_count} páginas)")
+    
+    async def _rasterize(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        output_format: str, 
+        pages: Optional[str], 
+        dpi: Optional[int], 
+        width: Optional[int]
+    ) -> List[bytes]:
+        """Gera o PDF do template e rasteriza só as páginas pedidas, em processo"""
+        if self.render_pool is not None:
+            return await self.render_pool.render_raster(template_name, data, output_format, pages, dpi, width)
+        
+        pdf_buffer = BytesIO()
+        await self._generate_pdf_weasyprint(template_name, data, pdf_buffer)
+        
+        return await run_in_executor(
+            self.executor, "render",
+            lambda: rasterize_pdf(pdf_buffer.getvalue(), output_format, pages=pages, dpi=dpi, width=width)
+        )
+    
+    async def _rasterize_paged(
+        self, 
+        template_name: str, 
+        data: Dict[str, Any], 
+        container: str, 
+        output: Union[str, BinaryIO], 
+        dpi: Optional[int], 
+        width: Optional[int]
+    ):
+        """Gera o PDF e grava todas as páginas no zip/TIFF à medida que são rasterizadas"""
+        if self.render_pool is not None:
+            result = await self.render_pool.render_paged(
+                template_name, data, container, output if isinstance(output, str) else None, dpi, width
+            )
+            if not isinstance(output, str):
+                output.write(result)
+            return
+        
+        pdf_buffer = BytesIO()
+        await self._generate_pdf_weasyprint(template_name, data, pdf_buffer)
+        
+        await run_in_executor(
+            self.executor, "render",
+            lambda: write_paged_pdf(pdf_buffer.getvalue(), output, container, template_name, dpi=dpi, width=width)
+        )
+    
+    async def _generate_image_direct(self, template_name: str, data: Dict[str, Any], output: Union[str, BinaryIO], format: str):
+        """
+        Gera imagem diretamente usando PIL (sem precisar de PDF intermediário)
+        
+        O conteúdo é distribuído em páginas de tamanho fixo. png/jpeg trazem só a
+        primeira página; zip/tiff trazem todas, gravadas uma a uma.
+        """
         def _create_image():
             # Processar dados
             processed_data = self._process_template_data_sync(template_name, data)
             
             # Configurações da imagem
-            width, height = 800, 1200  # A4-like proportions
+            width, height = 800, int(os.getenv("IMAGE_PAGE_HEIGHT", "1200"))  # A4-like proportions
             background_color = "white"
             text_color = "black"
             
-            # Criar imagem
-            img = Image.new('RGB', (width, height), color=background_color)
-            draw = ImageDraw.Draw(img)
+            # Fontes resolvidas e carregadas uma vez por processo
+            title_font = font_registry.font("sans", 36)
+            header_font = font_registry.font("sans", 24)
+            normal_font = font_registry.font("sans", 16)
+            small_font = font_registry.font("sans", 12)
             
-            # Tentar usar fonte personalizada, senão usar padrão
-            try:
-                title_font = ImageFont.truetype("arial.ttf", 36)
-                header_font = ImageFont.truetype("arial.ttf", 24)
-                normal_font = ImageFont.truetype("arial.ttf", 16)
-                small_font = ImageFont.truetype("arial.ttf", 12)
-            except:
-                # Fallback para fonte padrão
-                title_font = ImageFont.load_default()
-                header_font = ImageFont.load_default()
-                normal_font = ImageFont.load_default()
-                small_font = ImageFont.load_default()
-            
-            y_position = 50
-            
-            if template_name == "fatura":
-                y_position = self._draw_fatura_image(draw, processed_data, width, y_position, 
-                                                  title_font, header_font, normal_font, small_font, text_color)
-            elif template_name == "certificado":
-                y_position = self._draw_certificado_image(draw, processed_data, width, y_position, 
-                                                        title_font, header_font, normal_font, small_font, text_color)
-            elif template_name == "fique_de_olho":
-                y_position = self._draw_fique_de_olho_image(draw, processed_data, width, y_position, 
-                                                          title_font, header_font, normal_font, small_font, text_color)
-            elif template_name == "catalogo_produtos":
-                y_position = self._draw_catalogo_produtos_image(draw, processed_data, width, y_position, 
-                                                              title_font, header_font, normal_font, small_font, text_color)
-            
-            # Salvar imagem
-            if format.lower() == "jpeg" and img.mode != "RGB":
-                img = img.convert("RGB")
-            img.save(output_path, format.upper(), quality=95)
+            draw_methods = {
+                "fatura": self._draw_fatura_image,
+                "certificado": self._draw_certificado_image,
+                "fique_de_olho": self._draw_fique_de_olho_image,
+                "catalogo_produtos": self._draw_catalogo_produtos_image
+            }
+            
+            def _layout(draw):
+                draw_method = draw_methods.get(template_name)
+                if draw_method:
+                    draw_method(draw, processed_data, width, 50,
+                                title_font, header_font, normal_font, small_font, text_color)
+            
+            if format in PAGED_FORMATS:
+                writer = PageWriter(output, format, template_name)
+                try:
+                    with stage("layout"):
+                        PagedCanvas(width, height, writer.add, background=background_color).layout(_layout)
+                finally:
+                    writer.close()
+                return
+            
+            def _save_first_page(img):
+                # Salvar imagem
+                if format.lower() == "jpeg" and img.mode != "RGB":
+                    img = img.convert("RGB")
+                img.save(output, format.upper(), quality=95)
+            
+            with stage("layout"):
+                PagedCanvas(width, height, _save_first_page, background=background_color, max_pages=1).layout(_layout)
         
         # Executar em thread separada
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, _create_image)
+        await run_in_executor(self.executor, "render", _create_image)
     
     def _draw_fatura_image(self, draw, data, width, y_pos, title_font, header_font, normal_font, small_font, text_color):
         """Desenha fatura na imagem"""
@@ -482,22 +822,36 @@ class DocumentGenerator:
         
         return y_pos
     
-    async def _generate_pdf_weasyprint(self, template_name: str, data: Dict[str, Any], output_path: str):
+    async def _generate_pdf_weasyprint(self, template_name: str, data: Dict[str, Any], output: Union[str, BinaryIO]):
         """Gera PDF usando WeasyPrint"""
+        if self.render_pool is not None:
+            if isinstance(output, str):
+                await self.render_pool.render_pdf(template_name, data, output)
+            else:
+                output.write(await self.render_pool.render_pdf(template_name, data))
+            return
+        
         import weasyprint
         
         def _create_pdf():
             # Renderizar HTML
             html_content = self._render_template_sync(template_name, data)
+            html_content, stylesheets, font_config = self.stylesheet_cache.prepare(template_name, html_content)
             # Configurações do WeasyPrint
-            document = weasyprint.HTML(string=html_content, base_url=".")
-            document.write_pdf(output_path)
+            html = weasyprint.HTML(
+                string=html_content,
+                base_url=self.asset_store.base_url,
+                url_fetcher=self.asset_store.url_fetcher
+            )
+            with stage("layout"):
+                document = html.render(stylesheets=stylesheets, font_config=font_config)
+            with stage("write"):
+                document.write_pdf(output)
         
         # Executar em thread separada
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, _create_pdf)
+        await run_in_executor(self.executor, "render", _create_pdf)
     
-    async def _generate_pdf_reportlab(self, template_name: str, data: Dict[str, Any], output_path: str):
+    async def _generate_pdf_reportlab(self, template_name: str, data: Dict[str, Any], output: Union[str, BinaryIO]):
         """Gera PDF usando ReportLab (versão simplificada)"""
         from reportlab.pdfgen import canvas
         from reportlab.lib.pagesizes import A4
@@ -510,24 +864,26 @@ class DocumentGenerator:
             # Processar dados
             processed_data = self._process_template_data_sync(template_name, data)
             
-            doc = SimpleDocTemplate(output_path, pagesize=A4)
+            # invariant: sem data/ID aleatório, PDFs idênticos para os mesmos dados
+            doc = SimpleDocTemplate(output, pagesize=A4, invariant=True)
             styles = getSampleStyleSheet()
             story = []
             
-            if template_name == "fatura":
-                self._build_fatura_reportlab(story, styles, processed_data)
-            elif template_name == "certificado":
-                self._build_certificado_reportlab(story, styles, processed_data)
-            elif template_name == "fique_de_olho":
-                self._build_fique_de_olho_reportlab(story, styles, processed_data)
-            elif template_name == "catalogo_produtos":
-                self._build_catalogo_produtos_reportlab(story, styles, processed_data)
-            
-            doc.build(story)
+            # No ReportLab a montagem e a gravação do PDF acontecem juntas
+            with stage("layout"):
+                if template_name == "fatura":
+                    self._build_fatura_reportlab(story, styles, processed_data)
+                elif template_name == "certificado":
+                    self._build_certificado_reportlab(story, styles, processed_data)
+                elif template_name == "fique_de_olho":
+                    self._build_fique_de_olho_reportlab(story, styles, processed_data)
+                elif template_name == "catalogo_produtos":
+                    self._build_catalogo_produtos_reportlab(story, styles, processed_data)
+                
+                doc.build(story)
         
         # Executar em thread separada
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, _create_pdf)
+        await run_in_executor(self.executor, "render", _create_pdf)
     
     def _build_fatura_reportlab(self, story, styles, data):
         """Constrói fatura usando ReportLab"""
@@ -662,8 +1018,24 @@ class DocumentGenerator:
         from reportlab.lib.styles import ParagraphStyle
         from reportlab.graphics.shapes import Drawing, Rect, String
         from reportlab.graphics import renderPDF
+        from reportlab.platypus.flowables import Flowable
         from io import BytesIO
         
+        class OutlineEntry(Flowable):
+            """Marcador invisível no sumário do PDF, na página do fabricante"""
+            def __init__(self, title):
+                super().__init__()
+                self.title = title
+                self.keepWithNext = True
+            
+            def wrap(self, available_width, available_height):
+                return (0, 0)
+            
+            def draw(self):
+                key = f"outline-{id(self)}"
+                self.canv.bookmarkPage(key)
+                self.canv.addOutlineEntry(self.title, key, level=0)
+        
         # Título
         title_style = ParagraphStyle(
             'CustomTitle',
@@ -673,10 +1045,13 @@ class DocumentGenerator:
             alignment=TA_CENTER,
             textColor=colors.HexColor('#2196F3')
         )
-        story.append(Paragraph("CATÁLOGO DE PRODUTOS", title_style))
+        # Na renderização em partes, só a primeira parte traz o cabeçalho
+        mostrar_cabecalho = data.get('mostrar_cabecalho', True)
+        if mostrar_cabecalho:
+            story.append(Paragraph("CATÁLOGO DE PRODUTOS", title_style))
         
         # Data de geração
-        if data.get('data_geracao'):
+        if mostrar_cabecalho and data.get('data_geracao'):
             date_style = ParagraphStyle(
                 'DateStyle',
                 parent=styles['Normal'],
@@ -700,8 +1075,18 @@ class DocumentGenerator:
             alignment=TA_LEFT
         )
         
+        # Baixar todas as imagens em paralelo antes da montagem do layout
+        self.image_cache.prefetch(
+            (produto.get('url_imagem_placeholder', ''), (120, 80))
+            for fabricante in data.get('catalogo_fabricantes', [])
+            for produto in fabricante.get('produtos', [])
+        )
+        
         # Para cada fabricante
         for fabricante in data.get('catalogo_fabricantes', []):
+            if not fabricante.get('continuacao'):
+                # Marcador no sumário do PDF
+                story.append(OutlineEntry(fabricante['nome_fabricante']))
             story.append(Paragraph(fabricante['nome_fabricante'], manufacturer_style))
             
             # Criar uma grade de produtos (2 colunas)
@@ -860,6 +1245,8 @@ class DocumentGenerator:
                 story.append(Spacer(1, 20))
         
         # Rodapé
+        if not data.get('mostrar_rodape', True):
+            return
         story.append(Spacer(1, 30))
         footer_style = ParagraphStyle(
             'Footer',
@@ -873,124 +1260,30 @@ class DocumentGenerator:
             footer_style
         ))
     
-    async def _convert_pdf_to_image(self, pdf_path: str, output_path: str, format: str):
-        """Converte PDF para imagem (método alternativo sem Poppler)"""
-        def _convert():
-            try:
-                # Tentar usar pdf2image (requer Poppler)
-                from pdf2image import convert_from_path
-                images = convert_from_path(pdf_path, dpi=300)
-                
-                if images:
-                    image = images[0]
-                    if format.lower() == "jpeg" and image.mode != "RGB":
-                        image = image.convert("RGB")
-                    image.save(output_path, format.upper())
-                    return
-            except ImportError:
-                print("⚠️  pdf2image não disponível (requer Poppler)")
-            except Exception as e:
-                print(f"⚠️  Erro ao converter PDF: {e}")
-            
-            # Fallback: criar imagem de placeholder informativa
-            img = Image.new('RGB', (800, 600), color='white')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font = ImageFont.truetype("arial.ttf", 20)
-                small_font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                font = ImageFont.load_default()
-                small_font = ImageFont.load_default()
-            
-            # Mensagem informativa
-            text1 = "⚠️ Conversão PDF→Imagem não disponível"
-            text2 = "Para gerar imagens, use geração direta:"
-            text3 = "Este PDF foi gerado com sucesso!"
-            text4 = f"Arquivo: {os.path.basename(pdf_path)}"
-            
-            draw.text((50, 200), text1, fill="red", font=font)
-            draw.text((50, 250), text2, fill="black", font=small_font)
-            draw.text((50, 300), text3, fill="green", font=small_font)
-            draw.text((50, 350), text4, fill="blue", font=small_font)
-            
-            img.save(output_path, format.upper())
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, _convert)
-    
     def _render_template_sync(self, template_name: str, data: Dict[str, Any]) -> str:
         """Versão síncrona do render template"""
         processed_data = self._process_template_data_sync(template_name, data)
-        template = self.jinja_env.get_template(f"{template_name}.html")
-        return template.render(**processed_data)
+        with stage("jinja_render"):
+            template = self.jinja_env.get_template(f"{template_name}.html")
+            return template.render(**processed_data)
     
     def _process_template_data_sync(self, template_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Versão síncrona do processamento de dados"""
-        processed_data = data.copy()
-        
-        # Adicionar data atual se não fornecida
-        if "data_atual" not in processed_data:
-            processed_data["data_atual"] = datetime.now().strftime("%d/%m/%Y")
-        
-        # Formatação de valores monetários
-        if "valor" in processed_data:
-            processed_data["valor_formatado"] = f"R$ {processed_data['valor']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        
-        if "itens" in processed_data:
-            for item in processed_data["itens"]:
-                if "valor" in item:
-                    item["valor_formatado"] = f"R$ {item['valor']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        
-        return processed_data
+        with stage("data_processing"):
+            return process_template_data(template_name, data)
     
     def cleanup_temp_files(self, max_age_hours: int = 24):
-        """Remove arquivos temporários antigos"""
+        """Remove arquivos temporários antigos (a limpeza periódica roda em temp_store)"""
         try:
-            import time
-            current_time = time.time()
-            
-            for filename in os.listdir(self.temp_dir):
-                file_path = os.path.join(self.temp_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getctime(file_path)
-                    if file_age > (max_age_hours * 3600):
-                        os.remove(file_path)
-                        print(f"Arquivo temporário removido: {filename}")
+            self.temp_store.sweep(max_age_seconds=max_age_hours * 3600)
         except Exception as e:
             print(f"Erro ao limpar arquivos temporários: {e}")
     
     def _download_image_from_url(self, url: str, max_size: tuple = (300, 200)) -> BytesIO:
         """
-        Download an image from URL and return it as BytesIO
+        Imagem da URL como PNG redimensionado em BytesIO, servida pelo cache de imagens
         """
-        try:
-            # Set a timeout and user agent
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10, stream=True)
-            response.raise_for_status()
-            
-            # Load image
-            img = Image.open(BytesIO(response.content))
-            
-            # Convert to RGB if necessary  
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize if too large
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Save to BytesIO
-            img_buffer = BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            
-            return img_buffer
-            
-        except Exception as e:
-            print(f"⚠️ Erro ao baixar imagem de {url}: {e}")
-            return None 
\ No newline at end of file
+        content = self.image_cache.get(url, max_size)
+        if content is None:
+            return None
+        return BytesIO(content)
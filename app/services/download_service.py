@@ -0,0 +1,269 @@
+import os
+import re
+import asyncio
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Any, Optional
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+
+_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+class FileRangeResponse(Response):
+    """
+    Corpo de um arquivo (inteiro ou um intervalo) lido em blocos fora do event loop
+
+    Se o servidor ASGI anunciar a extensão ``http.response.pathsend``, o arquivo
+    inteiro é entregue a ele pelo caminho (sendfile no servidor, sem passar pelo
+    Python).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        length: int,
+        status_code: int,
+        headers: Dict[str, str],
+        chunk_size: int,
+        full: bool
+    ):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.chunk_size = chunk_size
+        self.full = full
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if self.full and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        loop = asyncio.get_running_loop()
+        fd = await loop.run_in_executor(None, os.open, self.path, os.O_RDONLY)
+        try:
+            offset = self.start
+            remaining = self.length
+            while remaining > 0:
+                # pread: sem estado de posição compartilhado entre blocos
+                chunk = await loop.run_in_executor(None, os.pread, fd, min(self.chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # Arquivo encolheu durante o envio: encerra o corpo
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+
+class OffloadResponse(Response):
+    """
+    Resposta sem corpo para o proxy reverso entregar o arquivo (``X-Accel-Redirect``)
+
+    Não leva ``Content-Length``: o Starlette declararia ``0`` para o corpo vazio
+    e o tamanho real não corresponderia aos bytes enviados pela aplicação; o
+    proxy descarta este corpo e define o tamanho do arquivo que entrega.
+    """
+
+    def init_headers(self, headers: Optional[Dict[str, str]] = None) -> None:
+        super().init_headers(headers)
+        self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+
+
+class DownloadService:
+    """
+    Entrega de arquivos gerados com validadores, requisições condicionais e Range
+
+    Os arquivos de ``temp/`` são gravados uma única vez com nome único, então
+    ``ETag`` forte a partir de inode, tamanho e mtime é seguro. ``If-None-Match``
+    e ``If-Modified-Since`` respondem 304; ``Range`` (um intervalo, com
+    ``If-Range``) responde 206 ou 416. Arquivos grandes podem ser entregues pelo
+    proxy reverso com ``X-Accel-Redirect`` (nginx) ou ``X-Sendfile``.
+
+    Com ``DOWNLOAD_MODE=redirect``, documentos enviados ao MinIO são entregues
+    por redirecionamento para a URL pré-assinada (``redirect``).
+    """
+
+    def __init__(self, media_types: Dict[str, str]):
+        self.media_types = media_types
+        self.cache_control = os.getenv("DOWNLOAD_CACHE_CONTROL", "public, max-age=86400, immutable")
+        self.chunk_size = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+        # Ex.: X-Accel-Redirect com prefixo /protected/temp (location internal no nginx)
+        self.sendfile_header = os.getenv("DOWNLOAD_SENDFILE_HEADER", "")
+        self.sendfile_prefix = os.getenv("DOWNLOAD_SENDFILE_PREFIX", "").rstrip("/")
+        self.sendfile_min_bytes = int(os.getenv("DOWNLOAD_SENDFILE_MIN_BYTES", str(1024 * 1024)))
+        # local (padrão) ou redirect: documentos no MinIO são baixados direto dele
+        self.mode = os.getenv("DOWNLOAD_MODE", "local").lower()
+        self.redirect_status = int(os.getenv("DOWNLOAD_REDIRECT_STATUS", "307"))
+        # Arquivos locais menores que isso são servidos direto, sem o redirecionamento
+        self.redirect_min_bytes = int(os.getenv("DOWNLOAD_REDIRECT_MIN_BYTES", "0"))
+
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.not_modified = 0
+        self.partial = 0
+        self.range_not_satisfiable = 0
+        self.offloaded = 0
+        self.bytes_sent = 0
+        self.redirects = 0
+
+    @property
+    def redirect_enabled(self) -> bool:
+        return self.mode == "redirect"
+
+    def prefer_local(self, path: Optional[str]) -> bool:
+        """Arquivo local pequeno o bastante para não valer o redirecionamento"""
+        try:
+            return path is not None and os.path.getsize(path) < self.redirect_min_bytes
+        except OSError:
+            return False
+
+    def redirect(self, url: str) -> Response:
+        """Redireciona para a URL pré-assinada (que expira: não deve ser guardada em cache)"""
+        self._count("redirects")
+        return RedirectResponse(url, status_code=self.redirect_status, headers={"Cache-Control": "no-store"})
+
+    def respond(self, request: Request, path: str, filename: str) -> Response:
+        """Resposta para GET/HEAD do arquivo em ``path``"""
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{stat.st_ino:x}-{size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        extension = filename.rsplit(".", 1)[-1].lower()
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": self.cache_control,
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": self._content_disposition(filename)
+        }
+
+        if self._not_modified(request, etag, stat.st_mtime):
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+
+        headers["Content-Type"] = self.media_types.get(extension, "application/octet-stream")
+        start, length, status = 0, size, 200
+
+        byte_range = request.headers.get("range")
+        if byte_range and self._if_range_matches(request, etag, last_modified):
+            parsed = self._parse_range(byte_range, size)
+            if parsed is False:
+                self._count("range_not_satisfiable")
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            if parsed is not None:
+                start, end = parsed
+                length = end - start + 1
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+                self._count("partial")
+
+        headers["Content-Length"] = str(length)
+        self._count("downloads")
+        if request.method != "HEAD":
+            self._count("bytes_sent", length)
+
+        if self.sendfile_header and request.method != "HEAD" and status == 200 and size >= self.sendfile_min_bytes:
+            # O proxy lê o arquivo do disco (sendfile) e trata Range por conta própria;
+            # HEAD é respondido aqui mesmo, com o Content-Length real
+            self._count("offloaded")
+            headers[self.sendfile_header] = (
+                f"{self.sendfile_prefix}/{quote(filename)}" if self.sendfile_prefix else os.path.abspath(path)
+            )
+            del headers["Content-Length"]
+            return OffloadResponse(status_code=200, headers=headers)
+
+        return FileRangeResponse(path, start, length, status, headers, self.chunk_size, full=status == 200)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "downloads": self.downloads,
+                "not_modified": self.not_modified,
+                "partial": self.partial,
+                "range_not_satisfiable": self.range_not_satisfiable,
+                "offloaded": self.offloaded,
+                "bytes_sent": self.bytes_sent,
+                "redirects": self.redirects
+            }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _not_modified(self, request: Request, etag: str, mtime: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # Comparação fraca (RFC 9110 13.1.2); If-Modified-Since é ignorado
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            since = self._parse_date(if_modified_since)
+            return since is not None and int(mtime) <= since
+        return False
+
+    def _if_range_matches(self, request: Request, etag: str, last_modified: str) -> bool:
+        """Sem If-Range o Range vale; com ele, só se o validador for o atual (comparação forte)"""
+        if_range = request.headers.get("if-range")
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            return if_range == etag
+        return if_range == last_modified
+
+    def _parse_range(self, value: str, size: int):
+        """
+        Intervalo único ``bytes=a-b``, ``bytes=a-`` ou ``bytes=-n``
+
+        Returns:
+            (início, fim) inclusivos; None para ignorar o cabeçalho (vários
+            intervalos ou sintaxe inválida: responde o arquivo inteiro);
+            False se não houver bytes no intervalo (416)
+        """
+        match = _RANGE.match(value)
+        if match is None:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            suffix = int(last)
+            if suffix == 0 or size == 0:
+                return False
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            return False
+        return start, end
+
+    def _parse_date(self, value: str) -> Optional[int]:
+        try:
+            return int(parsedate_to_datetime(value).timestamp())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def _content_disposition(self, filename: str) -> str:
+        quoted = quote(filename)
+        if quoted != filename:
+            return f"attachment; filename*=utf-8''{quoted}"
+        return f'attachment; filename="{filename}"'
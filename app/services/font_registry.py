@@ -0,0 +1,177 @@
+import os
+import shutil
+import threading
+import subprocess
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import ImageFont
+
+from .asset_store import PROJECT_ROOT
+
+class FontRegistry:
+    """
+    Fontes do renderizador PIL, resolvidas uma única vez por processo
+
+    Cada família lógica (``sans``, ``sans-bold``) é procurada, nesta ordem, em
+    ``IMAGE_FONT_PATH``, nos diretórios de fontes do projeto e de
+    ``IMAGE_FONT_DIRS``, no fontconfig (``fc-match``), nos diretórios de fontes
+    do sistema e, por fim, na fonte escalável embutida no Pillow. As fontes
+    carregadas ficam em cache por (família, tamanho) e as medições de texto são
+    memorizadas.
+    """
+
+    # Arquivos aceitos para cada família, em ordem de preferência
+    FAMILIES = {
+        "sans": [
+            "arial.ttf", "liberationsans-regular.ttf", "dejavusans.ttf",
+            "notosans-regular.ttf", "freesans.ttf", "helvetica.ttc"
+        ],
+        "sans-bold": [
+            "arialbd.ttf", "arial bold.ttf", "liberationsans-bold.ttf", "dejavusans-bold.ttf",
+            "notosans-bold.ttf", "freesansbold.ttf"
+        ]
+    }
+
+    # Padrões do fontconfig para cada família
+    FONTCONFIG_PATTERNS = {
+        "sans": "sans-serif:style=Regular",
+        "sans-bold": "sans-serif:style=Bold"
+    }
+
+    SYSTEM_FONT_DIRS = [
+        "/usr/share/fonts",
+        "/usr/local/share/fonts",
+        os.path.expanduser("~/.fonts"),
+        os.path.expanduser("~/.local/share/fonts"),
+        "/Library/Fonts",
+        "/System/Library/Fonts",
+        os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts")
+    ]
+
+    def __init__(self, font_dirs: Optional[List[str]] = None):
+        extra_dirs = [d for d in os.getenv("IMAGE_FONT_DIRS", "").split(os.pathsep) if d]
+        self.project_font_dirs = font_dirs or [
+            os.path.join(PROJECT_ROOT, "public", "fonts"),
+            os.path.join(PROJECT_ROOT, "app", "public", "fonts")
+        ] + extra_dirs
+        self.font_path = os.getenv("IMAGE_FONT_PATH")
+
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Optional[str]] = {}
+        self._fonts: Dict[Tuple[str, int], Any] = {}
+        self._system_index: Optional[Dict[str, str]] = None
+
+        # Medições de texto memorizadas; a chave inclui o objeto da fonte (em cache)
+        self._measure = lru_cache(maxsize=int(os.getenv("FONT_MEASURE_CACHE_SIZE", "4096")))(
+            self._measure_uncached
+        )
+
+    def font(self, family: str = "sans", size: int = 16):
+        """Retorna a fonte carregada para (família, tamanho)"""
+        key = (family, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                font = self._load(family, size)
+                self._fonts[key] = font
+            return font
+
+    def text_bbox(self, xy: Tuple[float, float], text: str, font) -> Tuple[float, float, float, float]:
+        """Equivalente a ``ImageDraw.textbbox`` (âncora padrão), com cache"""
+        left, top, right, bottom = self._measure(text, font)
+        x, y = xy
+        return (left + x, top + y, right + x, bottom + y)
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._measure.cache_info()
+        return {
+            "fonts": {f"{family}:{size}": self._describe(family) for family, size in self._fonts},
+            "measure_hits": info.hits,
+            "measure_misses": info.misses,
+            "measure_entries": info.currsize
+        }
+
+    def resolve(self, family: str) -> Optional[str]:
+        """Caminho do arquivo da família, ou None para a fonte embutida no Pillow"""
+        if family not in self._paths:
+            self._paths[family] = self._find(family)
+            print(f"Fonte '{family}': {self._describe(family)}")
+        return self._paths[family]
+
+    def _load(self, family: str, size: int):
+        path = self.resolve(family)
+        if path:
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError as e:
+                print(f"⚠️ Erro ao carregar fonte {path}: {e}")
+        try:
+            # Pillow >= 10.1: fonte escalável embutida
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
+
+    def _find(self, family: str) -> Optional[str]:
+        if self.font_path and os.path.isfile(self.font_path):
+            return self.font_path
+
+        candidates = self.FAMILIES.get(family, self.FAMILIES["sans"])
+
+        project_index = self._index(self.project_font_dirs)
+        for name in candidates:
+            if name in project_index:
+                return project_index[name]
+
+        matched = self._fontconfig_match(family)
+        if matched:
+            return matched
+
+        if self._system_index is None:
+            self._system_index = self._index(self.SYSTEM_FONT_DIRS)
+        for name in candidates:
+            if name in self._system_index:
+                return self._system_index[name]
+        return None
+
+    def _fontconfig_match(self, family: str) -> Optional[str]:
+        if not shutil.which("fc-match"):
+            return None
+        pattern = self.FONTCONFIG_PATTERNS.get(family, self.FONTCONFIG_PATTERNS["sans"])
+        try:
+            result = subprocess.run(
+                ["fc-match", "--format=%{file}", pattern],
+                capture_output=True, text=True, timeout=5
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        path = result.stdout.strip()
+        # Fontes bitmap (pcf) não servem para ImageFont.truetype
+        if path.lower().endswith((".ttf", ".otf", ".ttc")) and os.path.isfile(path):
+            return path
+        return None
+
+    def _index(self, directories: List[str]) -> Dict[str, str]:
+        """Nome do arquivo (minúsculo) -> caminho, para os diretórios informados"""
+        index = {}
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    index.setdefault(filename.lower(), os.path.join(dirpath, filename))
+        return index
+
+    def _describe(self, family: str) -> str:
+        return self._paths.get(family) or "fonte embutida do Pillow"
+
+    @staticmethod
+    def _measure_uncached(text: str, font) -> Tuple[float, float, float, float]:
+        return font.getbbox(text)
+
+# Instância única do processo
+font_registry = FontRegistry()
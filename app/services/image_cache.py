@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from .metrics import stage
+from .disk_cache import DiskCacheIndex
+
+class ImageCache:
+    """
+    Cache de imagens de produtos usado na renderização de catálogos
+
+    Dois níveis: LRU em memória e arquivos em disco, ambos limitados em bytes
+    (``IMAGE_CACHE_MEMORY_BYTES`` e ``IMAGE_CACHE_DISK_MAX_BYTES``). A chave é a URL mais o
+    tamanho máximo da imagem, e o conteúdo guardado já é o PNG redimensionado.
+    Entradas vencidas são revalidadas com ETag/Last-Modified por uma sessão HTTP
+    com pool de conexões.
+    """
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_bytes: Optional[int] = None,
+        fresh_seconds: Optional[int] = None,
+        fetch_workers: Optional[int] = None,
+        max_disk_bytes: Optional[int] = None
+    ):
+        self.cache_dir = cache_dir or os.getenv("IMAGE_CACHE_DIR", os.path.join("temp", ".image_cache"))
+        self.max_memory_bytes = max_memory_bytes or int(os.getenv("IMAGE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+        self.fresh_seconds = fresh_seconds or int(os.getenv("IMAGE_CACHE_FRESH_SECONDS", "3600"))
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else int(
+            os.getenv("IMAGE_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))
+        )
+        self.fetch_workers = fetch_workers or int(os.getenv("IMAGE_FETCH_WORKERS", "16"))
+        self.timeout = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+        # Por quanto tempo uma URL que falhou não é tentada de novo
+        self.negative_ttl = int(os.getenv("IMAGE_CACHE_NEGATIVE_SECONDS", "60"))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.disk = DiskCacheIndex(self.cache_dir, (".png", ".json"), self.max_disk_bytes)
+
+        # Sessão com pool de conexões compartilhada entre as threads de download
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.fetch_workers, pool_maxsize=self.fetch_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = self.USER_AGENT
+
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        # Falhas recentes por chave, da mais antiga para a mais nova
+        self._failures: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Lock por chave enquanto houver threads usando-a: [lock, usuários]
+        self._key_locks: Dict[str, list] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self.errors = 0
+
+    def get(self, url: str, max_size: Tuple[int, int] = (300, 200)) -> Optional[bytes]:
+        """
+        Retorna a imagem em PNG já redimensionada, ou None se não puder ser obtida
+        """
+        key = self._key(url, max_size)
+
+        with self._key_lock(key):
+            cached = self._memory_get(key)
+            if cached and time.time() - cached[1] < self.fresh_seconds:
+                with self._lock:
+                    self.memory_hits += 1
+                return cached[0]
+
+            content, meta = self._disk_get(key)
+            if content is not None and time.time() - meta["fetched_at"] < self.fresh_seconds:
+                with self._lock:
+                    self.disk_hits += 1
+                self._memory_put(key, content, meta["fetched_at"])
+                return content
+
+            with self._lock:
+                failed_at = self._failures.get(key)
+                if failed_at and time.time() - failed_at >= self.negative_ttl:
+                    del self._failures[key]
+                    failed_at = None
+            if failed_at:
+                return content
+
+            return self._fetch(key, url, max_size, content, meta)
+
+    def prefetch(self, items: Iterable[Tuple[str, Tuple[int, int]]]):
+        """Baixa em paralelo todas as imagens (url, tamanho) ainda não disponíveis"""
+        unique = list(dict.fromkeys((url, tuple(size)) for url, size in items if url))
+        if not unique:
+            return
+
+        with stage("image_fetch"), ThreadPoolExecutor(max_workers=min(self.fetch_workers, len(unique))) as pool:
+            list(pool.map(lambda item: self.get(item[0], item[1]), unique))
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        with self._lock:
+            stats = {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "revalidated": self.revalidated,
+                "downloads": self.downloads,
+                "errors": self.errors
+            }
+        stats.update(self.disk.stats())
+        return stats
+
+    def _fetch(
+        self,
+        key: str,
+        url: str,
+        max_size: Tuple[int, int],
+        stale_content: Optional[bytes],
+        meta: Optional[Dict[str, Any]]
+    ) -> Optional[bytes]:
+        """Baixa (ou revalida) a imagem e atualiza os dois níveis do cache"""
+        headers = {}
+        if stale_content is not None and meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+            if response.status_code == 304 and stale_content is not None:
+                meta["fetched_at"] = time.time()
+                self._disk_put(key, None, meta)
+                self._memory_put(key, stale_content, meta["fetched_at"])
+                with self._lock:
+                    self.revalidated += 1
+                return stale_content
+
+            response.raise_for_status()
+            content = self._process(response.content, max_size)
+
+            meta = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time()
+            }
+            self._disk_put(key, content, meta)
+            self._memory_put(key, content, meta["fetched_at"])
+            with self._lock:
+                self._failures.pop(key, None)
+                self.downloads += 1
+            return content
+
+        except Exception as e:
+            print(f"⚠️ Erro ao baixar imagem de {url}: {e}")
+            with self._lock:
+                self._record_failure(key)
+                self.errors += 1
+            # Melhor servir a versão vencida do que nenhuma imagem
+            return stale_content
+
+    def _process(self, content: bytes, max_size: Tuple[int, int]) -> bytes:
+        """Converte para RGB, reduz para caber em max_size e codifica em PNG"""
+        img = Image.open(BytesIO(content))
+
+        # Convert to RGB if necessary
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+
+        # Resize if too large
+        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        img_buffer = BytesIO()
+        img.save(img_buffer, format='PNG')
+        return img_buffer.getvalue()
+
+    def _key(self, url: str, max_size: Tuple[int, int]) -> str:
+        return hashlib.sha256(f"{url}|{max_size[0]}x{max_size[1]}".encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        # Evita downloads duplicados da mesma imagem por threads concorrentes; o lock
+        # é descartado quando a última thread o libera
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def _record_failure(self, key: str):
+        """Registra a falha; as já vencidas são descartadas (chamado com self._lock)"""
+        now = time.time()
+        self._failures[key] = now
+        self._failures.move_to_end(key)
+        while self._failures and now - next(iter(self._failures.values())) >= self.negative_ttl:
+            self._failures.popitem(last=False)
+
+    def _memory_get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, content: bytes, fetched_at: float):
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous[0])
+            self._memory[key] = (content, fetched_at)
+            self._memory_bytes += len(content)
+
+            while self._memory and self._memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _disk_get(self, key: str) -> Tuple[Optional[bytes], Optional[Dict[str, Any]]]:
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(self.cache_dir, f"{key}.png"), "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None, None
+        self.disk.touch(key)
+        return content, meta
+
+    def _disk_put(self, key: str, content: Optional[bytes], meta: Dict[str, Any]):
+        """Grava conteúdo (se informado) e metadados de forma atômica"""
+        try:
+            if content is not None:
+                self._write_atomic(os.path.join(self.cache_dir, f"{key}.png"), content)
+            self._write_atomic(
+                os.path.join(self.cache_dir, f"{key}.json"),
+                json.dumps(meta).encode("utf-8")
+            )
+        except OSError as e:
+            print(f"⚠️ Erro ao gravar imagem no cache em disco: {e}")
+            return
+        # Apaga as imagens menos usadas se o diretório passar do limite
+        self.disk.add(key)
+
+    def _write_atomic(self, path: str, content: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
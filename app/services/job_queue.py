@@ -0,0 +1,349 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from .metrics import run_in_executor
+
+# Estados possíveis de um job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class QueueFullError(Exception):
+    """A fila de jobs atingiu a profundidade máxima"""
+
+class JobStore(ABC):
+    """
+    Interface do armazenamento de jobs
+
+    Os métodos são bloqueantes; a ``JobQueue`` os executa fora do event loop.
+    """
+
+    @abstractmethod
+    def create(self, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_by_status(self, status: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Remove jobs finalizados antes do timestamp informado"""
+
+class InMemoryJobStore(JobStore):
+    """Armazenamento em memória (perde os jobs ao reiniciar)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_by_status(self, status: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values() if j["status"] == status]
+        return sorted(jobs, key=lambda j: j["created_at"])
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.get("finished_at") and job["finished_at"] < older_than
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+class SQLiteJobStore(JobStore):
+    """Armazenamento em SQLite para uso em um único nó (sobrevive a reinícios)"""
+
+    _COLUMNS = (
+        "id", "status", "progress", "stage", "request", "result", "error",
+        "created_at", "started_at", "finished_at"
+    )
+    _JSON_COLUMNS = ("request", "result")
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                stage TEXT,
+                request TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any]):
+        row = self._to_row(job)
+        placeholders = ", ".join("?" for _ in row)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(row)}) VALUES ({placeholders})",
+                tuple(row.values())
+            )
+
+    def update(self, job_id: str, **fields):
+        if not fields:
+            return
+        row = self._to_row(fields)
+        assignments = ", ".join(f"{column} = ?" for column in row)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*row.values(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def list_by_status(self, status: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE status = ? ORDER BY created_at",
+                (status,)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (older_than,)
+            )
+        return cursor.rowcount
+
+    def _to_row(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for column, value in fields.items():
+            if column not in self._COLUMNS:
+                raise ValueError(f"Campo de job desconhecido: {column}")
+            if column in self._JSON_COLUMNS and value is not None:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            row[column] = value
+        return row
+
+    def _from_row(self, row: tuple) -> Dict[str, Any]:
+        job = dict(zip(self._COLUMNS, row))
+        for column in self._JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+def create_job_store() -> JobStore:
+    """Cria o armazenamento configurado em JOB_STORE (memory ou sqlite)"""
+    backend = os.getenv("JOB_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH", os.path.join("temp", "jobs.sqlite3")))
+    if backend != "memory":
+        raise ValueError(f"JOB_STORE inválido: '{backend}' (use memory ou sqlite)")
+    return InMemoryJobStore()
+
+# handler(payload, report_progress) -> resultado serializável em JSON
+JobHandler = Callable[[Dict[str, Any], Callable[[int, str], None]], Awaitable[Dict[str, Any]]]
+
+class JobQueue:
+    """
+    Fila limitada de jobs de renderização executados em segundo plano
+
+    Poucos workers (JOB_WORKERS) consomem a fila, deixando o restante da
+    capacidade de renderização livre para as requisições interativas.
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        store: Optional[JobStore] = None,
+        max_depth: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.handler = handler
+        self.store = store or create_job_store()
+        self.max_depth = max_depth or int(os.getenv("JOB_QUEUE_DEPTH", "100"))
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "1"))
+        self.retention_seconds = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+        # Acesso ao armazenamento (SQLite bloqueia) fora do event loop; uma thread
+        # mantém as atualizações de um job na ordem em que foram feitas
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Inicia os workers e retoma jobs pendentes do armazenamento"""
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+
+        # Jobs que estavam rodando quando o processo parou não têm como ser retomados
+        for job in await self._store(self.store.list_by_status, JOB_RUNNING):
+            await self._store(
+                self.store.update,
+                job["id"],
+                status=JOB_FAILED,
+                error="Job interrompido pelo reinício do serviço",
+                finished_at=time.time()
+            )
+
+        for job in await self._store(self.store.list_by_status, JOB_QUEUED):
+            if self._queue.full():
+                await self._store(
+                    self.store.update,
+                    job["id"],
+                    status=JOB_FAILED,
+                    error="Fila cheia ao retomar jobs pendentes",
+                    finished_at=time.time()
+                )
+            else:
+                self._queue.put_nowait(job["id"])
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Interrompe os workers (jobs na fila permanecem no armazenamento)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enfileira um job
+
+        Raises:
+            QueueFullError: se a fila atingiu JOB_QUEUE_DEPTH
+        """
+        if self._queue is None:
+            raise RuntimeError("Fila de jobs não iniciada")
+        if self._queue.full():
+            raise QueueFullError(f"Fila de jobs cheia ({self.max_depth} pendentes)")
+
+        await self._store(self.store.purge, time.time() - self.retention_seconds)
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": JOB_QUEUED,
+            "progress": 0,
+            "stage": JOB_QUEUED,
+            "request": payload,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        await self._store(self.store.create, job)
+        try:
+            self._queue.put_nowait(job["id"])
+        except asyncio.QueueFull:
+            # Outra requisição ocupou a última vaga enquanto o job era gravado
+            await self._store(
+                self.store.update, job["id"], status=JOB_FAILED, error="Fila cheia", finished_at=time.time()
+            )
+            raise QueueFullError(f"Fila de jobs cheia ({self.max_depth} pendentes)")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._store(self.store.get, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "workers": self.workers
+        }
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _store(self, method: Callable, *args, **fields):
+        """Executa uma operação do armazenamento na thread do job store"""
+        return await run_in_executor(self.executor, "job_store", lambda: method(*args, **fields))
+
+    async def _run(self, job_id: str):
+        job = await self._store(self.store.get, job_id)
+        if job is None or job["status"] != JOB_QUEUED:
+            return
+
+        await self._store(
+            self.store.update, job_id, status=JOB_RUNNING, stage="starting", progress=5, started_at=time.time()
+        )
+
+        def report_progress(progress: int, stage: str):
+            # Chamado do event loop: só enfileira a gravação (em ordem, na única thread)
+            self.executor.submit(self.store.update, job_id, progress=progress, stage=stage)
+
+        try:
+            result = await self.handler(job["request"], report_progress)
+            await self._store(
+                self.store.update,
+                job_id,
+                status=JOB_COMPLETED,
+                stage=JOB_COMPLETED,
+                progress=100,
+                result=result,
+                finished_at=time.time()
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._store(
+                self.store.update,
+                job_id,
+                status=JOB_FAILED,
+                stage=JOB_FAILED,
+                error=getattr(e, "detail", None) or str(e),
+                finished_at=time.time()
+            )
@@ -0,0 +1,189 @@
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Rótulos da renderização corrente (template, formato, engine)
+_render_labels: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "render_labels", default=None
+)
+# Etapas registradas na requisição corrente, quando alguém está coletando
+_stage_log: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "stage_log", default=None
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_SECONDS = Histogram(
+    "document_request_seconds",
+    "Duração total da geração de um documento (inclui upload)",
+    ["template", "format", "engine", "cached"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "document_stage_seconds",
+    "Duração de cada etapa da geração",
+    ["stage", "template", "format", "engine"],
+    buckets=LATENCY_BUCKETS
+)
+OUTPUT_BYTES = Histogram(
+    "document_output_bytes",
+    "Tamanho dos documentos gerados",
+    ["template", "format"],
+    buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 20_000_000, 100_000_000)
+)
+ERRORS = Counter(
+    "document_errors_total",
+    "Gerações que terminaram em erro",
+    ["template", "format", "status"]
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth",
+    "Tarefas aguardando um worker livre",
+    ["executor"]
+)
+EXECUTOR_ACTIVE = Gauge(
+    "executor_active_workers",
+    "Workers executando uma tarefa",
+    ["executor"]
+)
+
+def _labels() -> Dict[str, str]:
+    return _render_labels.get() or {"template": "unknown", "format": "unknown", "engine": "unknown"}
+
+@contextmanager
+def render_context(template_name: str, output_format: str):
+    """
+    Define os rótulos das métricas para a geração corrente e mede a duração total
+
+    O ``engine`` é preenchido por ``set_engine`` quando a engine é escolhida.
+    """
+    labels = {"template": template_name, "format": output_format, "engine": "none"}
+    token = _render_labels.set(labels)
+    start = time.perf_counter()
+    status = {"cached": False}
+    try:
+        yield status
+    except Exception as e:
+        ERRORS.labels(template_name, output_format, str(getattr(e, "status_code", 500))).inc()
+        raise
+    else:
+        REQUEST_SECONDS.labels(
+            template_name, output_format, labels["engine"], str(status["cached"]).lower()
+        ).observe(time.perf_counter() - start)
+    finally:
+        _render_labels.reset(token)
+
+def set_engine(engine: str):
+    """Registra a engine usada na geração corrente"""
+    labels = _render_labels.get()
+    if labels is not None:
+        labels["engine"] = engine
+
+def observe_output(size: int):
+    labels = _labels()
+    OUTPUT_BYTES.labels(labels["template"], labels["format"]).observe(size)
+
+@contextmanager
+def stage(name: str):
+    """Mede uma etapa da geração (validation, jinja_render, layout, write...)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def record_stage(name: str, seconds: float):
+    labels = _labels()
+    STAGE_SECONDS.labels(name, labels["template"], labels["format"], labels["engine"]).observe(seconds)
+    log = _stage_log.get()
+    if log is not None:
+        log.append((name, seconds))
+
+@contextmanager
+def stage_log():
+    """Coleta as etapas registradas no contexto corrente em uma lista de (etapa, segundos)"""
+    log: List[Tuple[str, float]] = []
+    token = _stage_log.set(log)
+    try:
+        yield log
+    finally:
+        _stage_log.reset(token)
+
+def collect_stages(fn: Callable, *args) -> Tuple[Any, List[Tuple[str, float]]]:
+    """
+    Executa ``fn`` registrando suas etapas; usado nos workers do pool de processos,
+    que devolvem as etapas ao processo da API junto com o resultado
+    """
+    with stage_log() as log:
+        return fn(*args), log
+
+async def run_in_executor(executor, name: str, fn: Callable, *args):
+    """
+    ``loop.run_in_executor`` com métricas de fila e de workers ativos
+
+    O contexto (rótulos e etapas da requisição) é propagado para a thread.
+    """
+    loop = asyncio.get_event_loop()
+    context = contextvars.copy_context()
+    queued = EXECUTOR_QUEUE_DEPTH.labels(name)
+    active = EXECUTOR_ACTIVE.labels(name)
+    lock = threading.Lock()
+    state = {"queued": True}
+
+    def _dequeue():
+        # Chamado ao começar a tarefa ou ao cancelá-la, o que vier primeiro
+        with lock:
+            if state["queued"]:
+                state["queued"] = False
+                queued.dec()
+
+    def _run():
+        _dequeue()
+        active.inc()
+        try:
+            return context.run(fn, *args)
+        finally:
+            active.dec()
+
+    queued.inc()
+    try:
+        return await loop.run_in_executor(executor, _run)
+    except asyncio.CancelledError:
+        _dequeue()
+        raise
+
+class StatsCollector:
+    """
+    Exporta os contadores de ``stats()`` de um serviço (caches, fila de jobs)
+
+    Campos listados em ``counters`` viram contadores; os demais campos numéricos
+    viram gauges.
+    """
+
+    def __init__(self, prefix: str, stats_fn: Callable[[], Dict[str, Any]], counters: Tuple[str, ...] = ()):
+        self.prefix = prefix
+        self.stats_fn = stats_fn
+        self.counters = counters
+
+    def collect(self):
+        try:
+            stats = self.stats_fn()
+        except Exception:
+            return
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{key}"
+            if key in self.counters:
+                yield CounterMetricFamily(name, f"{self.prefix}: {key}", value=value)
+            else:
+                yield GaugeMetricFamily(name, f"{self.prefix}: {key}", value=value)
+
+def register_stats(prefix: str, stats_fn: Callable[[], Dict[str, Any]], counters: Tuple[str, ...] = ()):
+    REGISTRY.register(StatsCollector(prefix, stats_fn, counters))
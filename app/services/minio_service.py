@@ -1,10 +1,95 @@
 from minio import Minio
 from minio.error import S3Error
 import os
-from typing import Optional
+import re
+import time
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from io import BytesIO
+from typing import Dict, Any, List, Optional, BinaryIO, Tuple, Union
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+import certifi
+import urllib3
+from urllib3.util import Retry, Timeout
+
+from .metrics import run_in_executor, stage
+
+class _CountingRetry(Retry):
+    """Retry do urllib3 que contabiliza as novas tentativas (exportadas em /metrics)"""
+
+    retries = 0
+    _lock = threading.Lock()
+
+    def increment(self, *args, **kwargs):
+        with _CountingRetry._lock:
+            _CountingRetry.retries += 1
+        return super().increment(*args, **kwargs)
+
+class PresignedUrlCache:
+    """
+    URLs pré-assinadas por nome de objeto, reaproveitadas até ``refresh_seconds``
+    antes de expirar (LRU limitado a ``max_entries``)
+    """
+
+    def __init__(self, max_entries: int, refresh_seconds: int):
+        self.max_entries = max_entries
+        self.refresh_seconds = refresh_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, object_name: str) -> Optional[Tuple[str, float]]:
+        """(url, expira_em) ainda utilizável, ou None"""
+        with self._lock:
+            entry = self._entries.get(object_name)
+            if entry is None or entry[1] - time.time() < self.refresh_seconds:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(object_name)
+            self.hits += 1
+            return entry
+
+    def put(self, object_name: str, url: str, expires_at: float):
+        with self._lock:
+            self._entries[object_name] = (url, expires_at)
+            self._entries.move_to_end(object_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, object_name: str):
+        with self._lock:
+            self._entries.pop(object_name, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def content_object_name(prefix: str, digest: str, extension: str) -> str:
+    """Nome de objeto endereçado pelo conteúdo: ``documents/<prefixo>_<sha256[:32]>.<ext>``"""
+    return f"documents/{prefix}_{digest[:32]}.{extension}"
+
+# Apelidos: nome do arquivo em temp/ -> objeto, visíveis para todas as réplicas
+ALIAS_PREFIX = "aliases/"
+
+_CONTENT_NAME = re.compile(r"^[A-Za-z0-9_-]+_[0-9a-f]{32}\.[a-z]+$")
+
+def content_object_for(filename: str) -> Optional[str]:
+    """Objeto de um nome no formato de ``content_object_name`` (sem ``documents/``), ou None"""
+    return f"documents/{filename}" if _CONTENT_NAME.match(filename) else None
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 class MinIOService:
     def __init__(self):
         # Configurações do MinIO (podem ser definidas via variáveis de ambiente)
@@ -13,17 +98,80 @@ class MinIOService:
         self.secret_key = os.getenv("MINIO_SECRET_KEY", "minioadmin")
         self.bucket_name = os.getenv("MINIO_BUCKET_NAME", "documents")
         self.secure = os.getenv("MINIO_SECURE", "False").lower() == "true"
+        # Com a região definida o cliente não consulta a localização do bucket
+        self.region = os.getenv("MINIO_REGION") or None
+        
+        # Upload multipart: tamanho de cada parte (mínimo 5 MiB) e partes enviadas em paralelo
+        self.part_size = max(int(os.getenv("MINIO_PART_SIZE", str(16 * 1024 * 1024))), 5 * 1024 * 1024)
+        self.parallel_uploads = max(int(os.getenv("MINIO_PARALLEL_UPLOADS", "4")), 1)
+        
+        # Operações simultâneas (threads) e conexões: cada operação pode usar até
+        # parallel_uploads conexões, então o pool acompanha o executor
+        self.max_workers = int(os.getenv("MINIO_WORKERS", "8"))
+        required_connections = self.max_workers * self.parallel_uploads
+        self.max_connections = int(os.getenv("MINIO_MAX_CONNECTIONS", str(required_connections)))
+        if self.max_connections < required_connections:
+            print(
+                f"⚠️  MINIO_MAX_CONNECTIONS={self.max_connections} é menor que MINIO_WORKERS x "
+                f"MINIO_PARALLEL_UPLOADS ({required_connections}); uploads vão esperar por conexões"
+            )
+        
+        self.connect_timeout = float(os.getenv("MINIO_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("MINIO_READ_TIMEOUT", "60"))
+        self.retries = int(os.getenv("MINIO_RETRIES", "3"))
+        self.retry_backoff = float(os.getenv("MINIO_RETRY_BACKOFF", "0.2"))
+        
+        # Pool de conexões reaproveitadas; bloqueia em vez de abrir conexões descartáveis
+        self.http = urllib3.PoolManager(
+            num_pools=4,
+            maxsize=self.max_connections,
+            block=True,
+            timeout=Timeout(connect=self.connect_timeout, read=self.read_timeout),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=_CountingRetry(
+                total=self.retries,
+                backoff_factor=self.retry_backoff,
+                status_forcelist=[500, 502, 503, 504]
+            )
+        )
         
         # Inicializar cliente MinIO
         self.client = Minio(
             endpoint=self.endpoint,
             access_key=self.access_key,
             secret_key=self.secret_key,
-            secure=self.secure
+            secure=self.secure,
+            region=self.region,
+            http_client=self.http
         )
         
         # Executor para operações síncronas
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        
+        # URLs pré-assinadas: validade (máximo de 7 dias no S3) e reaproveitamento
+        self.presign_expiry = min(
+            int(os.getenv("MINIO_PRESIGN_EXPIRY_SECONDS", str(7 * 24 * 3600))), 7 * 24 * 3600
+        )
+        self.presign_cache = PresignedUrlCache(
+            max_entries=int(os.getenv("MINIO_PRESIGN_CACHE_SIZE", "10000")),
+            # Renovada quando falta menos que isso para expirar
+            refresh_seconds=min(
+                int(os.getenv("MINIO_PRESIGN_REFRESH_SECONDS", str(24 * 3600))), self.presign_expiry // 2
+            )
+        )
+        
+        # Objetos endereçados pelo conteúdo sabidamente presentes no bucket (LRU)
+        self.known_objects_max = int(os.getenv("MINIO_KNOWN_OBJECTS", "100000"))
+        self._known_objects: "OrderedDict[str, None]" = OrderedDict()
+        self._known_lock = threading.Lock()
+        # Apelidos já resolvidos (LRU, mesmo limite do índice de objetos)
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        # Uploads em andamento por nome, para que envios idênticos simultâneos virem um só
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.dedup_hits = 0
+        self.dedup_bytes_saved = 0
+        self.uploads = 0
     
     async def ensure_bucket_exists(self) -> bool:
         """Garante que o bucket existe, criando se necessário"""
@@ -35,8 +183,7 @@ class MinIOService:
                 return False
             
             # Executar em thread separada
-            loop = asyncio.get_event_loop()
-            created = await loop.run_in_executor(self.executor, _check_bucket)
+            created = await run_in_executor(self.executor, "minio", _check_bucket)
             
             if created:
                 print(f"Bucket '{self.bucket_name}' criado com sucesso")
@@ -62,32 +209,320 @@ class MinIOService:
         """
         try:
             def _upload():
-                # Fazer upload do arquivo
+                # Fazer upload do arquivo (multipart acima de part_size)
                 self.client.fput_object(
                     bucket_name=self.bucket_name,
                     object_name=object_name,
-                    file_path=file_path
+                    file_path=file_path,
+                    content_type=self._guess_content_type(object_name),
+                    part_size=self.part_size,
+                    num_parallel_uploads=self.parallel_uploads
                 )
-                
-                # Gerar URL pressinada (válida por 7 dias)
-                from datetime import timedelta
-                url = self.client.presigned_get_object(
+                return self.presigned_url(object_name)
+            
+            # Executar em thread separada
+            with stage("minio_upload"):
+                url = await run_in_executor(self.executor, "minio", _upload)
+            
+            print(f"Arquivo '{file_path}' enviado para MinIO como '{object_name}'")
+            return url
+            
+        except S3Error as e:
+            raise Exception(f"Erro ao fazer upload para MinIO: {e}")
+    
+    async def upload_bytes(
+        self,
+        data: Union[bytes, BinaryIO],
+        object_name: str,
+        content_type: Optional[str] = None,
+        length: Optional[int] = None
+    ) -> str:
+        """
+        Faz upload direto da memória (ou de um stream), sem passar pelo disco
+        
+        Args:
+            data: Conteúdo em bytes ou stream binário
+            object_name: Nome do objeto no MinIO
+            content_type: Content-Type do objeto (deduzido pela extensão se omitido)
+            length: Tamanho do stream; se omitido em streams, o upload é multipart
+            
+        Returns:
+            URL do arquivo no MinIO
+        """
+        if isinstance(data, (bytes, bytearray)):
+            length = len(data)
+            data = BytesIO(data)
+        elif length is None:
+            # Tamanho desconhecido: o SDK envia em partes de part_size
+            length = -1
+        
+        try:
+            def _upload():
+                self.client.put_object(
                     bucket_name=self.bucket_name,
                     object_name=object_name,
-                    expires=timedelta(days=7)
+                    data=data,
+                    length=length,
+                    content_type=content_type or self._guess_content_type(object_name),
+                    part_size=self.part_size,
+                    num_parallel_uploads=self.parallel_uploads
                 )
-                return url
+                return self.presigned_url(object_name)
             
-            # Executar em thread separada
-            loop = asyncio.get_event_loop()
-            url = await loop.run_in_executor(self.executor, _upload)
+            with stage("minio_upload"):
+                url = await run_in_executor(self.executor, "minio", _upload)
             
-            print(f"Arquivo '{file_path}' enviado para MinIO como '{object_name}'")
+            print(f"Conteúdo em memória enviado para MinIO como '{object_name}'")
             return url
             
         except S3Error as e:
             raise Exception(f"Erro ao fazer upload para MinIO: {e}")
     
+    async def store_file(self, file_path: str, prefix: str) -> Tuple[str, str]:
+        """
+        Envia um arquivo com nome endereçado pelo conteúdo, uma única vez
+        
+        Se o objeto já existe (índice local ou stat no bucket), o upload é
+        dispensado e só a URL é devolvida.
+        
+        Returns:
+            (nome do objeto, URL pré-assinada)
+        """
+        extension = os.path.splitext(file_path)[1].lstrip(".")
+        digest = await run_in_executor(self.executor, "minio", file_digest, file_path)
+        object_name = content_object_name(prefix, digest, extension)
+        size = os.path.getsize(file_path)
+        url = await self._store_once(object_name, size, lambda: self.upload_file(file_path, object_name))
+        return object_name, url
+    
+    async def store_bytes(
+        self,
+        data: bytes,
+        prefix: str,
+        extension: str,
+        content_type: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Equivalente a ``store_file`` para um documento em memória"""
+        object_name = content_object_name(prefix, hashlib.sha256(data).hexdigest(), extension)
+        url = await self._store_once(
+            object_name,
+            len(data),
+            lambda: self.upload_bytes(data, object_name=object_name, content_type=content_type)
+        )
+        return object_name, url
+    
+    async def _store_once(self, object_name: str, size: int, upload) -> str:
+        inflight = self._inflight.get(object_name)
+        if inflight is not None:
+            # Mesmo conteúdo já sendo enviado por outra requisição
+            await asyncio.wait((inflight,))
+            if inflight.cancelled():
+                # A requisição que enviava foi cancelada (cliente desconectou): esta
+                # segue normalmente e faz o envio ela mesma
+                return await self._store_once(object_name, size, upload)
+            inflight.result()
+            self._count_dedup(size)
+            return await self.presign_url(object_name)
+        
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[object_name] = future
+        try:
+            if await self.object_exists(object_name):
+                self._count_dedup(size)
+                url = await self.presign_url(object_name)
+            else:
+                url = await upload()
+                self.uploads += 1
+                self._remember(object_name)
+            future.set_result(None)
+            return url
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Ninguém mais aguardando: evita o aviso de exceção não recuperada
+            future.exception()
+            raise
+        finally:
+            del self._inflight[object_name]
+    
+    async def object_exists(self, object_name: str) -> bool:
+        """Verifica se o objeto existe: primeiro no índice local, depois com stat no bucket"""
+        with self._known_lock:
+            if object_name in self._known_objects:
+                self._known_objects.move_to_end(object_name)
+                return True
+        
+        def _stat():
+            try:
+                self.client.stat_object(self.bucket_name, object_name)
+                return True
+            except S3Error as e:
+                if e.code in ("NoSuchKey", "NoSuchObject", "NotFound"):
+                    return False
+                raise
+        
+        exists = await run_in_executor(self.executor, "minio", _stat)
+        if exists:
+            self._remember(object_name)
+        return exists
+    
+    async def put_alias(self, alias: str, object_name: str):
+        """
+        Registra ``aliases/<alias>`` apontando para o objeto
+        
+        Permite que qualquer réplica resolva o nome de um arquivo de temp/
+        para o documento no MinIO, mesmo sem o arquivo local.
+        """
+        def _put():
+            body = object_name.encode("utf-8")
+            self.client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=f"{ALIAS_PREFIX}{alias}",
+                data=BytesIO(body),
+                length=len(body),
+                content_type="text/plain"
+            )
+        
+        await run_in_executor(self.executor, "minio", _put)
+        self._cache_alias(alias, object_name)
+    
+    async def resolve_alias(self, alias: str, remote: bool = True) -> Optional[str]:
+        """Objeto de um apelido: do cache local e, com ``remote``, do bucket"""
+        with self._known_lock:
+            object_name = self._aliases.get(alias)
+            if object_name is not None:
+                self._aliases.move_to_end(alias)
+                return object_name
+        if not remote:
+            return None
+        
+        def _get():
+            try:
+                response = self.client.get_object(self.bucket_name, f"{ALIAS_PREFIX}{alias}")
+            except S3Error as e:
+                if e.code in ("NoSuchKey", "NoSuchObject", "NotFound"):
+                    return None
+                raise
+            try:
+                return response.read().decode("utf-8")
+            finally:
+                response.close()
+                response.release_conn()
+        
+        object_name = await run_in_executor(self.executor, "minio", _get)
+        if object_name:
+            self._cache_alias(alias, object_name)
+        return object_name
+    
+    def _cache_alias(self, alias: str, object_name: str):
+        with self._known_lock:
+            self._aliases[alias] = object_name
+            self._aliases.move_to_end(alias)
+            while len(self._aliases) > self.known_objects_max:
+                self._aliases.popitem(last=False)
+    
+    def _remember(self, object_name: str):
+        with self._known_lock:
+            self._known_objects[object_name] = None
+            self._known_objects.move_to_end(object_name)
+            while len(self._known_objects) > self.known_objects_max:
+                self._known_objects.popitem(last=False)
+    
+    def _count_dedup(self, size: int):
+        self.dedup_hits += 1
+        self.dedup_bytes_saved += size
+    
+    async def presign_url(self, object_name: str) -> str:
+        """
+        ``presigned_url`` para código assíncrono
+        
+        URLs em cache voltam direto; a assinatura (e, sem MINIO_REGION, a consulta
+        da região do bucket na primeira chamada) roda no executor do MinIO.
+        """
+        cached = self.presign_cache.get(object_name)
+        if cached is not None:
+            return cached[0]
+        url, _ = await run_in_executor(self.executor, "minio", self._sign, object_name)
+        return url
+    
+    def presigned_url(self, object_name: str) -> str:
+        """URL pré-assinada do objeto (reaproveitada do cache enquanto não está perto de expirar)"""
+        return self._presign(object_name)[0]
+    
+    def _presign(self, object_name: str) -> Tuple[str, float]:
+        return self.presign_cache.get(object_name) or self._sign(object_name)
+    
+    def _sign(self, object_name: str) -> Tuple[str, float]:
+        """Assina uma nova URL e a guarda no cache"""
+        expires_at = time.time() + self.presign_expiry
+        url = self.client.presigned_get_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            expires=timedelta(seconds=self.presign_expiry)
+        )
+        self.presign_cache.put(object_name, url, expires_at)
+        return url, expires_at
+    
+    async def presign_many(self, object_names: List[str], check_exists: bool = True) -> List[Dict[str, Any]]:
+        """
+        URLs pré-assinadas para vários objetos existentes, sem novo upload
+        
+        Com ``check_exists``, objetos sem URL em cache são verificados (stat)
+        em paralelo; os inexistentes voltam com ``url`` None.
+        
+        Returns:
+            Um item por objeto, na ordem pedida: object_name, url, expires_at
+        """
+        def _resolve(object_name: str) -> Dict[str, Any]:
+            cached = self.presign_cache.get(object_name)
+            if cached is None and check_exists:
+                try:
+                    self.client.stat_object(self.bucket_name, object_name)
+                except S3Error as e:
+                    if e.code in ("NoSuchKey", "NoSuchObject", "NotFound"):
+                        return {"object_name": object_name, "url": None, "expires_at": None}
+                    raise
+            url, expires_at = cached or self._sign(object_name)
+            return {"object_name": object_name, "url": url, "expires_at": expires_at}
+        
+        return list(await asyncio.gather(*(
+            run_in_executor(self.executor, "minio", _resolve, name) for name in object_names
+        )))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Ocupação do pool de conexões, tentativas repetidas e cache de URLs"""
+        in_use = 0
+        created = 0
+        requests = 0
+        for key in list(self.http.pools.keys()):
+            pool = self.http.pools.get(key)
+            if pool is None:
+                continue
+            # A fila do pool guarda as vagas livres (conexões ociosas ou None)
+            in_use += pool.pool.maxsize - pool.pool.qsize() if pool.pool else 0
+            created += pool.num_connections
+            requests += pool.num_requests
+        return {
+            "workers": self.max_workers,
+            "max_connections": self.max_connections,
+            "connections_in_use": in_use,
+            "connections_created": created,
+            "requests": requests,
+            "retries": _CountingRetry.retries,
+            "presign_cache_entries": len(self.presign_cache),
+            "presign_cache_hits": self.presign_cache.hits,
+            "presign_cache_misses": self.presign_cache.misses,
+            "uploads": self.uploads,
+            "dedup_hits": self.dedup_hits,
+            "dedup_bytes_saved": self.dedup_bytes_saved
+        }
+    
+    def _guess_content_type(self, object_name: str) -> str:
+        content_type, _ = mimetypes.guess_type(object_name)
+        return content_type or "application/octet-stream"
+    
     async def delete_file(self, object_name: str) -> bool:
         """Remove um arquivo do MinIO"""
         try:
@@ -96,10 +531,12 @@ class MinIOService:
                     bucket_name=self.bucket_name,
                     object_name=object_name
                 )
+                self.presign_cache.discard(object_name)
+                with self._known_lock:
+                    self._known_objects.pop(object_name, None)
                 return True
             
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(self.executor, _delete)
+            result = await run_in_executor(self.executor, "minio", _delete)
             
             print(f"Arquivo '{object_name}' removido do MinIO")
             return result
@@ -119,8 +556,7 @@ class MinIOService:
                 )
                 return [obj.object_name for obj in objects]
             
-            loop = asyncio.get_event_loop()
-            files = await loop.run_in_executor(self.executor, _list)
+            files = await run_in_executor(self.executor, "minio", _list)
             return files
             
         except S3Error as e:
@@ -0,0 +1,187 @@
+import zipfile
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, List, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, TiffImagePlugin
+
+from .font_registry import font_registry
+
+# Formatos de saída com uma imagem por página
+PAGED_FORMATS = ("zip", "tiff")
+
+def zip_entry(name: str) -> zipfile.ZipInfo:
+    """Entrada de zip com data fixa: o mesmo conteúdo gera sempre o mesmo arquivo"""
+    return zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+
+class _PageLimitReached(Exception):
+    """Interrompe o layout quando já foram emitidas as páginas pedidas"""
+
+class PagedCanvas:
+    """
+    Substituto de ``ImageDraw.Draw`` que distribui o desenho em páginas de tamanho fixo
+
+    O layout roda uma única vez, de cima para baixo, em coordenadas de um documento
+    de altura ilimitada. As operações são guardadas só até a página corrente
+    ficar completa; então a página é desenhada em um canvas de ``width`` x
+    ``page_height``, entregue a ``on_page`` e descartada. A memória fica limitada
+    a uma página, independente do tamanho do documento.
+
+    A quebra de página é recuada para não cortar elementos (caixas, textos);
+    fundos mais altos que uma página continuam na página seguinte.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        page_height: int,
+        on_page: Callable[[Image.Image], None],
+        margin: int = 50,
+        background: Any = "white",
+        max_pages: Optional[int] = None
+    ):
+        self.width = width
+        self.page_height = page_height
+        self.on_page = on_page
+        self.margin = margin
+        self.background = background
+        self.max_pages = max_pages
+        self.page_count = 0
+
+        # Medição de texto sem alocar um canvas do tamanho do documento
+        self._measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        # (y0, y1, método, args, kwargs) ainda não descartados
+        self._ops: List[Tuple[float, float, str, tuple, dict]] = []
+        # Coordenada do documento que corresponde ao topo da página corrente
+        self._offset = 0
+
+    def layout(self, draw_fn: Callable[["PagedCanvas"], Any]) -> int:
+        """
+        Executa o layout e emite todas as páginas (ou até ``max_pages``)
+
+        Returns:
+            Número de páginas emitidas
+        """
+        try:
+            draw_fn(self)
+            while self._ops or self.page_count == 0:
+                self._emit_page()
+        except _PageLimitReached:
+            pass
+        return self.page_count
+
+    # API de ImageDraw usada pelos métodos _draw_*_image
+
+    def textbbox(self, xy, text, font=None, **kwargs):
+        # Medição memorizada para o caso comum (uma linha, âncora padrão)
+        if font is not None and not kwargs and "\n" not in text:
+            return font_registry.text_bbox(xy, text, font)
+        return self._measure.textbbox(xy, text, font=font, **kwargs)
+
+    def text(self, xy, text, fill=None, font=None, **kwargs):
+        bbox = self.textbbox(xy, text, font=font)
+        self._record(bbox[1], bbox[3], "text", (xy, text), dict(fill=fill, font=font, **kwargs))
+
+    def rectangle(self, xy, **kwargs):
+        self._record_shape("rectangle", xy, kwargs)
+
+    def ellipse(self, xy, **kwargs):
+        self._record_shape("ellipse", xy, kwargs)
+
+    def line(self, xy, **kwargs):
+        self._record_shape("line", xy, kwargs)
+
+    def _record_shape(self, method: str, xy, kwargs: dict):
+        ys = [point[1] for point in xy] if isinstance(xy[0], (tuple, list)) else list(xy[1::2])
+        self._record(min(ys), max(ys), method, (xy,), kwargs)
+
+    def _record(self, y0: float, y1: float, method: str, args: tuple, kwargs: dict):
+        # O layout já passou do fim da página corrente: ela está completa
+        while y0 >= self._nominal_cut():
+            self._emit_page()
+        self._ops.append((y0, y1, method, args, kwargs))
+
+    def _nominal_cut(self) -> float:
+        return self._offset + self.page_height - self.margin
+
+    def _choose_cut(self) -> float:
+        """Recua a quebra de página para antes dos elementos que ela cortaria"""
+        cut = self._nominal_cut()
+        usable = self.page_height - 2 * self.margin
+        top = self._offset + self.margin
+        while True:
+            spanning = [
+                y0 for y0, y1, *_ in self._ops
+                if y0 < cut < y1 and y1 - y0 <= usable
+            ]
+            if not spanning or min(spanning) <= top:
+                return cut
+            cut = min(spanning)
+
+    def _emit_page(self):
+        cut = self._choose_cut()
+
+        page = Image.new("RGB", (self.width, self.page_height), color=self.background)
+        draw = ImageDraw.Draw(page)
+        for y0, y1, method, args, kwargs in self._ops:
+            if y0 < cut and y1 > self._offset:
+                getattr(draw, method)(*self._shift(method, args, -self._offset), **kwargs)
+
+        # Elementos que continuam abaixo da quebra seguem para a próxima página
+        self._ops = [op for op in self._ops if op[1] > cut]
+        self._offset = cut - self.margin
+
+        self.page_count += 1
+        self.on_page(page)
+        page.close()
+
+        if self.max_pages and self.page_count >= self.max_pages:
+            raise _PageLimitReached()
+
+    @staticmethod
+    def _shift(method: str, args: tuple, dy: float) -> tuple:
+        if method == "text":
+            (x, y), text = args
+            return ((x, y + dy), text)
+
+        xy = args[0]
+        if isinstance(xy[0], (tuple, list)):
+            return ([(x, y + dy) for x, y in xy],)
+        return ([v + dy if i % 2 else v for i, v in enumerate(xy)],)
+
+class PageWriter:
+    """
+    Grava uma sequência de páginas em um zip (uma imagem PNG por página) ou em um
+    TIFF de várias páginas, à medida que são produzidas
+    """
+
+    def __init__(self, output: Union[str, BinaryIO], container: str, basename: str):
+        self.container = container
+        self.basename = basename
+        self.page_count = 0
+
+        if container == "zip":
+            self._archive = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED)
+        elif container == "tiff":
+            self._tiff = TiffImagePlugin.AppendingTiffWriter(output, new=True)
+        else:
+            raise ValueError(f"Formato de páginas não suportado: {container}")
+
+    def add(self, image: Image.Image):
+        """Acrescenta uma página"""
+        self.page_count += 1
+        if self.container == "zip":
+            buffer = BytesIO()
+            image.save(buffer, format="PNG")
+            self._archive.writestr(zip_entry(self._entry_name()), buffer.getvalue())
+        else:
+            image.save(self._tiff, format="TIFF", compression="tiff_deflate")
+            self._tiff.newFrame()
+
+    def close(self):
+        if self.container == "zip":
+            self._archive.close()
+        else:
+            self._tiff.close()
+
+    def _entry_name(self) -> str:
+        return f"{self.basename}_p{self.page_count}.png"
@@ -0,0 +1,193 @@
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+from .asset_store import PROJECT_ROOT
+from .metrics import stage_log
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class ProfilingError(Exception):
+    """Perfil negado ou indisponível; ``status_code`` é o status HTTP da resposta"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class SamplingProfiler:
+    """
+    Amostrador de pilhas em uma thread separada
+
+    A cada ``interval`` segundos registra a pilha de todas as threads que estão
+    executando código do projeto (threads ociosas do executor e o event loop
+    parado no ``select`` são ignorados). As amostras ficam no formato
+    "collapsed" (``frame;frame;frame contagem``), aceito por flamegraph.pl,
+    speedscope e inferno.
+    """
+
+    def __init__(self, interval: float, root: str = PROJECT_ROOT):
+        self.interval = interval
+        self.root = root
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            relevant = False
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename
+                if filename.startswith(self.root) and "site-packages" not in filename:
+                    relevant = True
+                    filename = os.path.relpath(filename, self.root)
+                else:
+                    filename = os.path.basename(filename)
+                stack.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if relevant:
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class RequestProfiler:
+    """
+    Perfil sob demanda de requisições individuais
+
+    Desligado por padrão: só é ativado com ``PROFILING_TOKEN`` definido e apenas
+    para requisições que apresentam esse token. Um perfil por vez no processo,
+    já que o amostrador enxerga todas as threads. Os perfis completos ficam em
+    ``PROFILING_DIR`` (padrão ``temp/profiles``) e os mais antigos são removidos
+    além de ``PROFILING_MAX_FILES``.
+    """
+
+    def __init__(self):
+        self.token = os.getenv("PROFILING_TOKEN") or None
+        self.interval = float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000
+        self.profiles_dir = os.getenv("PROFILING_DIR", os.path.join("temp", "profiles"))
+        self.max_files = int(os.getenv("PROFILING_MAX_FILES", "50"))
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def authorize(self, token: Optional[str]):
+        """Valida o token apresentado pela requisição"""
+        if not self.enabled:
+            raise ProfilingError(404, "Perfil de requisições desabilitado (PROFILING_TOKEN não definido)")
+        if not token or not hmac.compare_digest(token.encode(), self.token.encode()):
+            raise ProfilingError(403, "Token de perfil inválido")
+
+    @contextmanager
+    def profile(self, label: str):
+        """
+        Perfila o bloco: amostra as pilhas e coleta as etapas do DocumentGenerator
+
+        Produz um dicionário preenchido ao final com o resumo do perfil.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilingError(409, "Já existe um perfil em andamento; tente novamente")
+        summary: Dict[str, Any] = {}
+        profiler = SamplingProfiler(self.interval)
+        start = time.perf_counter()
+        try:
+            with stage_log() as stages:
+                profiler.start()
+                try:
+                    yield summary
+                finally:
+                    profiler.stop()
+                    summary.update(self._save(label, profiler, stages, time.perf_counter() - start))
+        finally:
+            self._lock.release()
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        """Caminho do perfil salvo, ou None se não existir"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.profiles_dir, f"{profile_id}.folded")
+        return path if os.path.exists(path) else None
+
+    def _save(
+        self,
+        label: str,
+        profiler: SamplingProfiler,
+        stages: List[Tuple[str, float]],
+        total: float
+    ) -> Dict[str, Any]:
+        profile_id = uuid.uuid4().hex
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        profiler.write_collapsed(os.path.join(self.profiles_dir, f"{profile_id}.folded"))
+        self._prune()
+
+        breakdown: Dict[str, Dict[str, float]] = {}
+        for name, seconds in stages:
+            entry = breakdown.setdefault(name, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+        for entry in breakdown.values():
+            entry["seconds"] = round(entry["seconds"], 6)
+
+        print(f"Perfil {profile_id} ({label}): {total * 1000:.1f} ms, {profiler.sample_count} amostras")
+        return {
+            "id": profile_id,
+            "total_seconds": round(total, 6),
+            "stages": breakdown,
+            "samples": profiler.sample_count,
+            "interval_ms": self.interval * 1000,
+            "download_url": f"/profiles/{profile_id}"
+        }
+
+    def _prune(self):
+        try:
+            files = [
+                os.path.join(self.profiles_dir, name)
+                for name in os.listdir(self.profiles_dir)
+                if name.endswith(".folded")
+            ]
+            files.sort(key=os.path.getmtime)
+            for path in files[:-self.max_files] if self.max_files > 0 else []:
+                os.remove(path)
+        except OSError as e:
+            print(f"Erro ao limpar perfis antigos: {e}")
+
+def server_timing(summary: Dict[str, Any]) -> str:
+    """Resumo das etapas no formato do cabeçalho ``Server-Timing``"""
+    parts = [
+        f"{name};dur={entry['seconds'] * 1000:.1f}"
+        for name, entry in summary.get("stages", {}).items()
+    ]
+    parts.append(f"total;dur={summary.get('total_seconds', 0) * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,170 @@
+import os
+import time
+import threading
+from io import BytesIO
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+from PIL import Image
+
+from .metrics import record_stage
+from .paged_image import PageWriter
+
+# PDFium não é thread-safe: uma renderização por vez em cada processo
+_pdfium_lock = threading.Lock()
+
+class RasterError(ValueError):
+    """Parâmetros de rasterização inválidos para o documento (ex.: página inexistente)"""
+
+class RasterUnavailableError(RasterError):
+    """Rasterização pedida sem WeasyPrint/pypdfium2 instalados"""
+
+def rasterizer_available() -> bool:
+    """Indica se o rasterizador em processo (pypdfium2) está instalado"""
+    try:
+        import pypdfium2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def parse_page_ranges(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Converte uma seleção de páginas em índices (base 0)
+
+    Aceita ``"all"``, páginas soltas e intervalos separados por vírgula,
+    ex.: ``"1"``, ``"1-3"``, ``"1,4-5"``. Páginas são numeradas a partir de 1.
+    """
+    if not spec or spec.strip().lower() == "all":
+        return list(range(page_count))
+
+    indices = []
+    for part in spec.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                start, end = (int(p) for p in part.split("-", 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise RasterError(f"Seleção de páginas inválida: '{spec}'")
+
+        if start < 1 or end < start:
+            raise RasterError(f"Intervalo de páginas inválido: '{part}'")
+        if end > page_count:
+            raise RasterError(f"Página {end} não existe (o documento tem {page_count} página(s))")
+
+        for index in range(start - 1, end):
+            if index not in indices:
+                indices.append(index)
+    return indices
+
+def iter_pdf_pages(
+    pdf: bytes,
+    pages: Optional[str] = "1",
+    dpi: Optional[int] = None,
+    width: Optional[int] = None
+) -> Iterator[Image.Image]:
+    """
+    Rasteriza as páginas selecionadas de um PDF, entregando uma de cada vez
+
+    Cada imagem é fechada quando o consumidor pede a próxima: só uma página
+    fica em memória, independente do tamanho do documento. O tempo de
+    renderização (sem o do consumidor) é registrado na etapa ``rasterize``.
+
+    Args:
+        pdf: Conteúdo do PDF
+        pages: Seleção de páginas (ver ``parse_page_ranges``)
+        dpi: Resolução desejada (padrão: RASTER_DEFAULT_DPI)
+        width: Largura em pixels; tem precedência sobre ``dpi``
+    """
+    import pypdfium2 as pdfium
+
+    default_dpi = int(os.getenv("RASTER_DEFAULT_DPI", "96"))
+    max_pixels = int(os.getenv("RASTER_MAX_PIXELS", str(40_000_000)))
+
+    elapsed = 0.0
+    with _pdfium_lock:
+        start = time.perf_counter()
+        document = pdfium.PdfDocument(pdf)
+        try:
+            for index in parse_page_ranges(pages, len(document)):
+                page = document[index]
+                try:
+                    page_width, page_height = page.get_size()
+                    # Tamanho da página em pontos (1/72 pol.)
+                    scale = width / page_width if width else (dpi or default_dpi) / 72
+
+                    if page_width * scale * page_height * scale > max_pixels:
+                        raise RasterError(
+                            f"Imagem da página {index + 1} excede RASTER_MAX_PIXELS ({max_pixels}); "
+                            "reduza dpi ou width"
+                        )
+
+                    bitmap = page.render(scale=scale)
+                    image = bitmap.to_pil()
+                    elapsed += time.perf_counter() - start
+                    try:
+                        yield image
+                    finally:
+                        start = time.perf_counter()
+                        image.close()
+                        bitmap.close()
+                finally:
+                    page.close()
+        finally:
+            document.close()
+            record_stage("rasterize", elapsed + time.perf_counter() - start)
+
+def rasterize_pdf(
+    pdf: bytes,
+    output_format: str,
+    pages: Optional[str] = "1",
+    dpi: Optional[int] = None,
+    width: Optional[int] = None
+) -> List[bytes]:
+    """
+    Rasteriza páginas de um PDF em memória, sem processos externos
+
+    Para poucas páginas (seleção de png/jpeg); documentos inteiros devem usar
+    ``write_paged_pdf``, que não acumula as imagens.
+
+    Returns:
+        Uma imagem codificada (png/jpeg) por página, na ordem da seleção
+    """
+    jpeg_quality = int(os.getenv("RASTER_JPEG_QUALITY", "90"))
+
+    images = []
+    for image in iter_pdf_pages(pdf, pages, dpi, width):
+        if output_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        if output_format == "jpeg":
+            image.save(buffer, format="JPEG", quality=jpeg_quality)
+        else:
+            image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+def write_paged_pdf(
+    pdf: bytes,
+    output: Union[str, BinaryIO],
+    container: str,
+    basename: str,
+    dpi: Optional[int] = None,
+    width: Optional[int] = None
+):
+    """
+    Rasteriza todas as páginas de um PDF direto em um zip ou TIFF multipágina
+
+    Cada página é gravada e descartada antes que a próxima seja renderizada.
+    """
+    elapsed = 0.0
+    writer = PageWriter(output, container, basename)
+    try:
+        for image in iter_pdf_pages(pdf, "all", dpi, width):
+            start = time.perf_counter()
+            writer.add(image)
+            elapsed += time.perf_counter() - start
+    finally:
+        start = time.perf_counter()
+        writer.close()
+        record_stage("write", elapsed + time.perf_counter() - start)
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+class RenderCache:
+    """
+    Cache de documentos renderizados, endereçado pelo conteúdo da requisição.
+
+    A chave é um hash canônico do fonte do template, dos dados normalizados e do
+    formato de saída. Cada entrada aponta para o arquivo já gerado em ``temp/`` e,
+    se houver, para o objeto correspondente no MinIO.
+    """
+
+    def __init__(
+        self,
+        templates_dir: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        self.templates_dir = templates_dir or os.path.join("app", "templates", "html")
+        self.enabled = os.getenv("RENDER_CACHE_ENABLED", "True").lower() == "true"
+        if max_entries is None:
+            max_entries = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "512"))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("RENDER_CACHE_TTL_SECONDS", "3600"))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._template_digests: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, template_name: str, data: Dict[str, Any], output_format: str, **options) -> str:
+        """
+        Calcula a chave canônica de uma requisição de geração
+
+        Deve ser chamada antes da geração, pois o processamento dos dados
+        adiciona campos derivados (ex.: ``valor_formatado``) aos itens.
+        """
+        normalized = self._normalize(data)
+
+        # Sem data_atual o documento depende do dia corrente
+        if "data_atual" not in normalized:
+            normalized["data_atual"] = datetime.now().strftime("%d/%m/%Y")
+
+        payload = json.dumps(
+            {
+                "template": template_name,
+                "template_digest": self._template_digest(template_name),
+                "data": normalized,
+                "format": output_format,
+                "options": self._normalize(options),
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada do cache, ou None se ausente, expirada ou sem arquivo"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expired = time.time() - entry["created_at"] > self.ttl_seconds
+            local_ok = entry.get("local_path") and all(
+                os.path.exists(path) for path in entry.get("local_paths") or [entry["local_path"]]
+            )
+            if expired or not (local_ok or entry.get("minio_url")):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            if not local_ok:
+                entry["local_path"] = None
+                entry["local_paths"] = None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def put(
+        self,
+        key: str,
+        local_path: Optional[str],
+        minio_url: Optional[str] = None,
+        object_name: Optional[str] = None,
+        local_paths: Optional[List[str]] = None
+    ):
+        """
+        Registra um documento recém-gerado
+
+        ``local_paths`` é usado quando a geração produz vários arquivos
+        (uma imagem por página); ``local_path`` é então o primeiro deles.
+        """
+        if not self.enabled:
+            return
+
+        size = sum(
+            os.path.getsize(path)
+            for path in local_paths or [local_path]
+            if path and os.path.exists(path)
+        )
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = {
+                "local_path": local_path,
+                "local_paths": local_paths,
+                "minio_url": minio_url,
+                "object_name": object_name,
+                "size": size,
+                "created_at": time.time()
+            }
+            self._total_bytes += size
+            self._evict()
+
+    def update_upload(
+        self,
+        key: str,
+        minio_url: str,
+        object_name: str,
+        minio_urls: Optional[List[str]] = None,
+        object_names: Optional[List[str]] = None
+    ):
+        """Associa o objeto do MinIO (ou um por página) a uma entrada existente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["minio_url"] = minio_url
+                entry["object_name"] = object_name
+                entry["minio_urls"] = minio_urls
+                entry["object_names"] = object_names
+
+    def clear(self):
+        """Remove todas as entradas (os arquivos em disco não são apagados)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0
+            }
+
+    def _evict(self):
+        """Remove entradas expiradas e, depois, as menos usadas até respeitar os limites"""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e["created_at"] > self.ttl_seconds]:
+            self._remove(key)
+            self.evictions += 1
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry["size"]
+
+    def _template_digest(self, template_name: str) -> str:
+        """Hash do fonte do template, recalculado apenas quando o arquivo muda"""
+        path = os.path.join(self.templates_dir, f"{template_name}.html")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return ""
+
+        cached = self._template_digests.get(template_name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._template_digests[template_name] = (mtime, digest)
+        return digest
+
+    def _normalize(self, value: Any) -> Any:
+        """Normaliza os dados para que payloads equivalentes gerem a mesma chave"""
+        if isinstance(value, dict):
+            return {str(k): self._normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(v) for v in value]
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
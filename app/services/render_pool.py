@@ -0,0 +1,229 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Union
+
+from .metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, collect_stages, record_stage, stage
+
+# Estado de cada processo worker, preenchido uma única vez em _init_worker
+_weasyprint = None
+_jinja_env = None
+_asset_store = None
+_stylesheet_cache = None
+
+def _init_worker(templates_dir: str):
+    """Importa o WeasyPrint, carrega os assets e compila os templates uma vez por processo"""
+    global _weasyprint, _jinja_env, _asset_store, _stylesheet_cache
+
+    import weasyprint
+    from .asset_store import AssetStore
+    from .stylesheet_cache import StylesheetCache
+    from ..templates.template_manager import TemplateManager
+
+    _weasyprint = weasyprint
+    _asset_store = AssetStore()
+    _stylesheet_cache = StylesheetCache(templates_dir, _asset_store)
+
+    # O bytecode em disco já foi gerado pelo processo principal
+    template_manager = TemplateManager(templates_dir=templates_dir)
+    _jinja_env = template_manager.create_environment()
+    template_manager.precompile(_jinja_env, verbose=False)
+
+def _render_pdf(template_name: str, data: Dict[str, Any], output_path: Optional[str]) -> Union[bytes, str]:
+    """Executado no worker: renderiza o template e gera o PDF"""
+    from .document_generator import process_template_data
+
+    with stage("data_processing"):
+        processed_data = process_template_data(template_name, data)
+    with stage("jinja_render"):
+        html_content = _jinja_env.get_template(f"{template_name}.html").render(**processed_data)
+    html_content, stylesheets, font_config = _stylesheet_cache.prepare(template_name, html_content)
+    html = _weasyprint.HTML(
+        string=html_content,
+        base_url=_asset_store.base_url,
+        url_fetcher=_asset_store.url_fetcher
+    )
+    with stage("layout"):
+        document = html.render(stylesheets=stylesheets, font_config=font_config)
+
+    with stage("write"):
+        if output_path:
+            document.write_pdf(output_path)
+            return output_path
+        return document.write_pdf()
+
+def _render_raster(
+    template_name: str,
+    data: Dict[str, Any],
+    output_format: str,
+    pages: Optional[str],
+    dpi: Optional[int],
+    width: Optional[int]
+) -> List[bytes]:
+    """Executado no worker: gera o PDF e rasteriza as páginas pedidas"""
+    from .rasterizer import rasterize_pdf
+
+    pdf = _render_pdf(template_name, data, None)
+    return rasterize_pdf(pdf, output_format, pages=pages, dpi=dpi, width=width)
+
+def _render_paged(
+    template_name: str,
+    data: Dict[str, Any],
+    container: str,
+    output_path: Optional[str],
+    dpi: Optional[int],
+    width: Optional[int]
+) -> Union[bytes, str]:
+    """Executado no worker: gera o PDF e grava todas as páginas em zip/TIFF, uma por vez"""
+    from io import BytesIO
+    from .rasterizer import write_paged_pdf
+
+    pdf = _render_pdf(template_name, data, None)
+    if output_path:
+        write_paged_pdf(pdf, output_path, container, template_name, dpi=dpi, width=width)
+        return output_path
+    buffer = BytesIO()
+    write_paged_pdf(pdf, buffer, container, template_name, dpi=dpi, width=width)
+    return buffer.getvalue()
+
+def _ping() -> int:
+    """Tarefa vazia usada para iniciar os workers antecipadamente"""
+    import time
+    time.sleep(0.05)
+    return os.getpid()
+
+class RenderPool:
+    """
+    Pool de processos para a renderização de PDFs com WeasyPrint
+
+    O layout do WeasyPrint é Python puro e segura o GIL, então threads não
+    escalam com o número de núcleos. Cada processo do pool importa o WeasyPrint
+    e compila os templates na inicialização.
+    """
+
+    def __init__(self, templates_dir: str, max_workers: Optional[int] = None):
+        self.templates_dir = os.path.abspath(templates_dir)
+        self.max_workers = max_workers or int(
+            os.getenv("RENDER_PROCESS_WORKERS", str(os.cpu_count() or 1))
+        )
+        self.executor = self._create_executor()
+        self._executor_lock = threading.Lock()
+        # Tarefas enviadas e ainda não concluídas (para as métricas)
+        self._in_flight = 0
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # "spawn" evita herdar threads e locks do processo da API
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.templates_dir,)
+        )
+
+    async def render_pdf(
+        self,
+        template_name: str,
+        data: Dict[str, Any],
+        output_path: Optional[str] = None
+    ) -> Union[bytes, str]:
+        """
+        Renderiza um PDF em um processo do pool
+
+        Args:
+            template_name: Nome do template
+            data: Dados para preenchimento
+            output_path: Se informado, o worker grava o PDF nesse caminho
+
+        Returns:
+            O caminho gravado, ou os bytes do PDF quando output_path é None
+        """
+        return await self._submit(_render_pdf, template_name, data, output_path)
+
+    async def render_raster(
+        self,
+        template_name: str,
+        data: Dict[str, Any],
+        output_format: str,
+        pages: Optional[str] = "1",
+        dpi: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> List[bytes]:
+        """
+        Gera o PDF e rasteriza as páginas selecionadas no mesmo worker
+
+        Returns:
+            Uma imagem codificada (png/jpeg) por página
+        """
+        return await self._submit(
+            _render_raster, template_name, data, output_format, pages, dpi, width
+        )
+
+    async def render_paged(
+        self,
+        template_name: str,
+        data: Dict[str, Any],
+        container: str,
+        output_path: Optional[str] = None,
+        dpi: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> Union[bytes, str]:
+        """
+        Gera o PDF e grava todas as páginas em um zip ou TIFF no mesmo worker
+
+        Returns:
+            O caminho gravado, ou o conteúdo do arquivo quando output_path é None
+        """
+        return await self._submit(_render_paged, template_name, data, container, output_path, dpi, width)
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_event_loop()
+        self._in_flight += 1
+        self._update_gauges()
+        try:
+            executor = self.executor
+            try:
+                result, stages = await loop.run_in_executor(executor, collect_stages, fn, *args)
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: OOM); recriar o pool e tentar uma vez
+                result, stages = await loop.run_in_executor(
+                    self._replace_executor(executor), collect_stages, fn, *args
+                )
+        finally:
+            self._in_flight -= 1
+            self._update_gauges()
+
+        # Etapas medidas no worker entram nas métricas do processo da API
+        for name, seconds in stages:
+            record_stage(name, seconds)
+        return result
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Substitui o pool quebrado, uma única vez
+
+        Várias requisições recebem BrokenProcessPool juntas; só a primeira cria o
+        novo pool e encerra o antigo, as demais usam o que ela criou.
+        """
+        with self._executor_lock:
+            if self.executor is broken:
+                print("⚠️  Pool de renderização quebrado, recriando workers")
+                self.executor = self._create_executor()
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self.executor
+
+    def _update_gauges(self):
+        EXECUTOR_ACTIVE.labels("render_pool").set(min(self._in_flight, self.max_workers))
+        EXECUTOR_QUEUE_DEPTH.labels("render_pool").set(max(0, self._in_flight - self.max_workers))
+
+    def warmup(self):
+        """Inicia todos os workers (e seus imports) antes da primeira requisição"""
+        futures = [self.executor.submit(_ping) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        """Encerra os processos do pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,50 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+class StartupTracker:
+    """
+    Registra a duração de cada fase da inicialização e se a API já está aquecida
+
+    A API aceita conexões logo após o import; engines, templates e workers são
+    aquecidos em segundo plano e só então ``ready`` passa a ser True.
+    """
+
+    def __init__(self):
+        self._started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready = False
+        self.ready_after_ms = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mede uma fase; erros são registrados e propagados"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self.errors[name] = str(e)
+            raise
+        finally:
+            with self._lock:
+                self.phases[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def mark_ready(self):
+        with self._lock:
+            self.ready = True
+            self.ready_after_ms = round((time.perf_counter() - self._started_at) * 1000, 1)
+        details = ", ".join(f"{name}={ms}ms" for name, ms in self.phases.items())
+        print(f"API pronta em {self.ready_after_ms} ms ({details})")
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "ready_after_ms": self.ready_after_ms,
+                "phases_ms": dict(self.phases),
+                "errors": dict(self.errors)
+            }
@@ -0,0 +1,100 @@
+import os
+import re
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Blocos <style> sem atributos; blocos com media/atributos ficam inline no HTML
+STYLE_BLOCK_RE = re.compile(r"<style>(.*?)</style>", re.S)
+IMPORTANT_RE = re.compile(r"!\s*important", re.I)
+LINK_STYLESHEET_RE = re.compile(r"<link\b[^>]*stylesheet", re.I)
+
+def extractable(source: str, blocks: List[str]) -> bool:
+    """Os blocos podem sair do HTML sem mudar a cascata (ver ``StylesheetCache``)"""
+    if "<style " in source or LINK_STYLESHEET_RE.search(source):
+        return False
+    return not any("{{" in block or "{%" in block or IMPORTANT_RE.search(block) for block in blocks)
+
+class StylesheetCache:
+    """
+    CSS dos templates já interpretado pelo WeasyPrint, reaproveitado entre renderizações
+
+    Os blocos ``<style>`` de cada template são extraídos do fonte e convertidos em
+    ``weasyprint.CSS`` uma única vez por worker (thread ou processo), junto com uma
+    ``FontConfiguration`` compartilhada. Quando um template muda em disco, o CSS e a
+    configuração de fontes são recriados.
+
+    O WeasyPrint trata o CSS passado em ``render(stylesheets=...)`` como origem
+    *user*, não *author*: regras de autor (``<link>``, ``style=""``) passam a
+    vencê-lo e ``!important`` inverte de precedência. Sem ``!important`` e sem
+    outras folhas de autor o resultado da cascata é o mesmo; templates fora
+    dessa condição, ou cujo CSS depende de variáveis Jinja, continuam com o CSS
+    inline.
+    """
+
+    def __init__(self, templates_dir: str, asset_store):
+        self.templates_dir = templates_dir
+        self.asset_store = asset_store
+        # Objetos do WeasyPrint/Pango não são compartilhados entre threads
+        self._local = threading.local()
+
+    def prepare(self, template_name: str, html_content: str) -> Tuple[str, List[Any], Any]:
+        """
+        Remove do HTML renderizado o CSS já interpretado
+
+        Returns:
+            (html sem os blocos <style> extraídos, lista de weasyprint.CSS, FontConfiguration)
+        """
+        state = self._state()
+        entry = self._entry(state, template_name)
+
+        if entry["stylesheets"]:
+            html_content = STYLE_BLOCK_RE.sub("", html_content, count=len(entry["stylesheets"]))
+
+        return html_content, entry["stylesheets"], state["font_config"]
+
+    def _state(self) -> Dict[str, Any]:
+        state = getattr(self._local, "state", None)
+        if state is None:
+            from weasyprint.text.fonts import FontConfiguration
+            state = {"font_config": FontConfiguration(), "entries": {}}
+            self._local.state = state
+        return state
+
+    def _entry(self, state: Dict[str, Any], template_name: str) -> Dict[str, Any]:
+        path = os.path.join(self.templates_dir, f"{template_name}.html")
+        mtime = os.stat(path).st_mtime_ns
+
+        entry = state["entries"].get(template_name)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        if entry is not None:
+            # Template alterado: @font-face antigos ficam registrados na configuração,
+            # então ela é recriada junto com o CSS de todos os templates
+            from weasyprint.text.fonts import FontConfiguration
+            state["font_config"] = FontConfiguration()
+            state["entries"].clear()
+
+        entry = {"mtime": mtime, "stylesheets": self._parse(path, state["font_config"])}
+        state["entries"][template_name] = entry
+        return entry
+
+    def _parse(self, path: str, font_config) -> List[Any]:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+
+        blocks = STYLE_BLOCK_RE.findall(source)
+        if not extractable(source, blocks):
+            return []
+
+        import weasyprint
+
+        return [
+            weasyprint.CSS(
+                string=block,
+                base_url=self.asset_store.base_url,
+                url_fetcher=self.asset_store.url_fetcher,
+                font_config=font_config
+            )
+            for block in blocks
+        ]
@@ -0,0 +1,295 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+
+class TempFileStore:
+    """
+    Diretório de documentos gerados com nomes únicos, cotas e limpeza automática
+
+    Os nomes são reservados com ``O_EXCL`` (nunca dois renders no mesmo
+    arquivo). Cada arquivo é registrado com tamanho e último acesso; uma thread
+    em segundo plano remove os arquivos mais antigos que ``TEMP_MAX_AGE_SECONDS``
+    e, enquanto o total passar de ``TEMP_MAX_BYTES`` ou o disco tiver menos de
+    ``TEMP_MIN_FREE_BYTES`` livres, os menos usados (LRU) até voltar abaixo da
+    marca inferior. Só arquivos com as extensões gerenciadas são considerados:
+    caches e bancos em subdiretórios ou com outras extensões não são tocados.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        extensions: Iterable[str] = ("pdf", "png", "jpeg", "zip", "tiff"),
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[int] = None,
+        min_free_bytes: Optional[int] = None
+    ):
+        self.directory = directory or self._default_directory()
+        self.extensions = tuple(f".{ext}" for ext in extensions)
+        self.max_bytes = max_bytes or int(os.getenv("TEMP_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+        self.max_age_seconds = max_age_seconds or int(os.getenv("TEMP_MAX_AGE_SECONDS", str(24 * 3600)))
+        self.min_free_bytes = min_free_bytes if min_free_bytes is not None else int(
+            os.getenv("TEMP_MIN_FREE_BYTES", str(512 * 1024 * 1024))
+        )
+        # Ao passar de um limite, remove até ficar nesta fração dele
+        self.low_watermark = float(os.getenv("TEMP_LOW_WATERMARK", "0.8"))
+        self.sweep_interval = float(os.getenv("TEMP_SWEEP_INTERVAL_SECONDS", "60"))
+        # Arquivos acessados há menos que isso não são removidos (upload/download em curso)
+        self.grace_seconds = float(os.getenv("TEMP_GRACE_SECONDS", "30"))
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # nome -> [tamanho, último acesso]; tamanho None enquanto o arquivo é gravado
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.allocated = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.sweeps = 0
+
+        self._scan()
+
+    def _default_directory(self) -> str:
+        directory = os.getenv("TEMP_DIR")
+        if directory:
+            return directory
+        if os.getenv("TEMP_USE_TMPFS", "False").lower() == "true":
+            if os.path.isdir("/dev/shm"):
+                return os.path.join("/dev/shm", "document-generator")
+            print("⚠️ TEMP_USE_TMPFS=true, mas /dev/shm não existe; usando temp/")
+        return os.path.join(os.getcwd(), "temp")
+
+    def allocate(self, prefix: str, extension: str, pages: Optional[int] = None) -> List[str]:
+        """
+        Reserva nomes únicos para um documento
+
+        Com ``pages``, reserva ``<nome>_p<N>.<ext>`` para cada página, todos com
+        a mesma base. O arquivo vazio é criado já na reserva; grave nele e
+        chame ``commit`` quando terminar.
+        """
+        suffixes = [f"_p{number}" for number in range(1, pages + 1)] if pages else [""]
+        while True:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base = f"{prefix}_{timestamp}_{uuid.uuid4().hex[:12]}"
+            names = [f"{base}{suffix}.{extension}" for suffix in suffixes]
+            created = []
+            try:
+                for name in names:
+                    fd = os.open(os.path.join(self.directory, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                    os.close(fd)
+                    created.append(name)
+            except FileExistsError:
+                for name in created:
+                    os.remove(os.path.join(self.directory, name))
+                continue
+
+            now = time.time()
+            with self._lock:
+                for name in names:
+                    self._entries[name] = [None, now]
+                self.allocated += len(names)
+            return [os.path.join(self.directory, name) for name in names]
+
+    def commit(self, paths: Iterable[str]):
+        """Registra o tamanho final dos arquivos gravados"""
+        over_limit = False
+        with self._lock:
+            for path in paths:
+                name = os.path.basename(path)
+                entry = self._entries.get(name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    self._entries.pop(name, None)
+                    continue
+                if entry is None:
+                    entry = self._entries[name] = [None, time.time()]
+                if entry[0] is not None:
+                    self._total_bytes -= entry[0]
+                entry[0] = size
+                self._total_bytes += size
+                self._entries.move_to_end(name)
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            # Não espera o próximo ciclo da limpeza
+            self._wake.set()
+
+    def discard(self, paths: Iterable[str]):
+        """Remove arquivos reservados cuja geração falhou"""
+        for path in paths:
+            self._remove(os.path.basename(path), evicted=False)
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """
+        Caminho de um arquivo gerenciado pelo nome, marcando-o como usado
+
+        None para nomes fora do diretório, com extensão não gerenciada ou
+        arquivos que não existem mais.
+        """
+        if os.path.basename(filename) != filename or not filename.endswith(self.extensions):
+            return None
+        path = os.path.join(self.directory, filename)
+        if not os.path.isfile(path):
+            with self._lock:
+                entry = self._entries.pop(filename, None)
+                if entry is not None and entry[0] is not None:
+                    self._total_bytes -= entry[0]
+            return None
+        self.touch([path])
+        return path
+
+    def touch(self, paths: Iterable[str]):
+        """Atualiza o último acesso (ordem do LRU)"""
+        now = time.time()
+        with self._lock:
+            for path in paths:
+                entry = self._entries.get(os.path.basename(path))
+                if entry is not None:
+                    entry[1] = now
+                    self._entries.move_to_end(os.path.basename(path))
+
+    def start(self):
+        """Inicia a limpeza periódica em segundo plano"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="temp-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def sweep(self, max_age_seconds: Optional[float] = None) -> Dict[str, int]:
+        """
+        Executa uma limpeza: idade, depois tamanho total e espaço livre em disco
+
+        Returns:
+            Arquivos removidos por motivo
+        """
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        now = time.time()
+        removed = {"age": 0, "size": 0, "disk": 0}
+
+        # Inclui reservas abandonadas (gravação que nunca terminou)
+        for name in self._candidates(lambda entry: now - entry[1] > max_age, include_pending=True):
+            removed["age"] += self._remove(name)
+
+        with self._lock:
+            over_size = self._total_bytes > self.max_bytes
+        if over_size:
+            target = self.max_bytes * self.low_watermark
+            for name in self._candidates(lambda entry: now - entry[1] > self.grace_seconds):
+                with self._lock:
+                    if self._total_bytes <= target:
+                        break
+                removed["size"] += self._remove(name)
+
+        if self.min_free_bytes and self._free_bytes() < self.min_free_bytes:
+            target = self.min_free_bytes / self.low_watermark
+            for name in self._candidates(lambda entry: now - entry[1] > self.grace_seconds):
+                if self._free_bytes() >= target:
+                    break
+                removed["disk"] += self._remove(name)
+
+        total = sum(removed.values())
+        with self._lock:
+            self.sweeps += 1
+        if total:
+            print(f"Limpeza de {self.directory}: {total} arquivo(s) removido(s) {removed}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupação e evictions do diretório"""
+        now = time.time()
+        with self._lock:
+            oldest = min((entry[1] for entry in self._entries.values()), default=None)
+            stats = {
+                "files": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "allocated": self.allocated,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "sweeps": self.sweeps,
+                "oldest_entry_age_seconds": round(now - oldest, 1) if oldest is not None else 0
+            }
+        stats["disk_free_bytes"] = self._free_bytes()
+        return stats
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Erro na limpeza de arquivos temporários: {e}")
+
+    def _candidates(self, predicate, include_pending: bool = False) -> List[str]:
+        """Arquivos já gravados que atendem ao critério, do menos para o mais recente"""
+        with self._lock:
+            return [
+                name for name, entry in sorted(self._entries.items(), key=lambda item: item[1][1])
+                if (include_pending or entry[0] is not None) and predicate(entry)
+            ]
+
+    def _remove(self, name: str, evicted: bool = True) -> int:
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is None:
+                return 0
+            size = entry[0] or 0
+            self._total_bytes -= size
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Erro ao remover arquivo temporário {name}: {e}")
+            return 0
+        if not evicted:
+            return 1
+        with self._lock:
+            self.evictions += 1
+            self.evicted_bytes += size
+        return 1
+
+    def _free_bytes(self) -> int:
+        try:
+            return shutil.disk_usage(self.directory).free
+        except OSError:
+            return 0
+
+    def _scan(self):
+        """Registra arquivos deixados por execuções anteriores (último acesso = mtime)"""
+        found: List[Tuple[float, str, int]] = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.name.endswith(self.extensions):
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name, stat.st_size))
+                except OSError:
+                    continue
+
+        with self._lock:
+            for mtime, name, size in sorted(found):
+                self._entries[name] = [size, mtime]
+                self._total_bytes += size
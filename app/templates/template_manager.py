@@ -1,9 +1,13 @@
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 
 class TemplateManager:
-    def __init__(self):
-        self.templates_dir = os.path.join("app", "templates", "html")
+    def __init__(self, templates_dir: Optional[str] = None):
+        self.templates_dir = templates_dir or os.path.join("app", "templates", "html")
+        self.compile_report: Dict[str, float] = {}
         self.available_templates = {
             "fatura": {
                 "name": "Fatura",
@@ -77,6 +81,45 @@ class TemplateManager:
             }
         }
     
+    def create_environment(self) -> Environment:
+        """
+        Cria o ambiente Jinja2 dos templates HTML
+        
+        O bytecode compilado fica em disco (JINJA_BYTECODE_CACHE_DIR) e é
+        compartilhado entre processos e reinícios. Com auto_reload, um template
+        alterado em disco é recarregado pelo mtime, sem reiniciar a API.
+        """
+        cache_dir = os.getenv("JINJA_BYTECODE_CACHE_DIR", os.path.join("temp", ".jinja_cache"))
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        return Environment(
+            loader=FileSystemLoader(self.templates_dir),
+            autoescape=True,
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            auto_reload=os.getenv("TEMPLATES_AUTO_RELOAD", "True").lower() == "true",
+            cache_size=max(len(self.available_templates) * 2, 50)
+        )
+    
+    def precompile(self, env: Environment, verbose: bool = True) -> Dict[str, float]:
+        """
+        Carrega e compila todos os templates disponíveis no ambiente
+        
+        Returns:
+            Tempo de carga de cada template em milissegundos
+        """
+        report = {}
+        for template_id in self.available_templates:
+            start = time.perf_counter()
+            env.get_template(f"{template_id}.html")
+            report[template_id] = (time.perf_counter() - start) * 1000
+        
+        self.compile_report = report
+        if verbose:
+            total = sum(report.values())
+            details = ", ".join(f"{name}={ms:.1f}ms" for name, ms in report.items())
+            print(f"Templates compilados em {total:.1f} ms ({details})")
+        return report
+    
     def list_templates(self) -> List[Dict[str, Any]]:
         """Lista todos os templates disponíveis com suas informações"""
         templates = []
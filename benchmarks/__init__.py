@@ -0,0 +1 @@
+"""Benchmarks offline e teste de carga da API de geração de documentos"""
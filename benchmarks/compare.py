@@ -0,0 +1,78 @@
+"""
+Compara dois resultados de ``benchmarks.run``
+
+Uso:
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/novo.json
+    python -m benchmarks.compare base.json novo.json --fail-above 10
+
+Com ``--fail-above``, o código de saída é 1 se o p50 de algum caso piorar mais
+do que a porcentagem informada.
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+METRICS = (
+    ("p50 ms", lambda r: r["latency_ms"]["p50"], False),
+    ("p99 ms", lambda r: r["latency_ms"]["p99"], False),
+    ("docs/s", lambda r: r["throughput_per_s"], True),
+    ("RSS MB", lambda r: r["peak_rss_mb"], False),
+    ("KB", lambda r: r["output_bytes"] / 1024, False)
+)
+
+def _load(path: str) -> Tuple[Dict[str, Any], Dict[tuple, Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    cases = {
+        (r["template"], r["size"], r["engine"], r["concurrency"]): r
+        for r in report["results"]
+        if "latency_ms" in r
+    }
+    return report["meta"], cases
+
+def _delta(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--fail-above", type=float, help="Regressão máxima aceita no p50 (%%)")
+    args = parser.parse_args(argv)
+
+    base_meta, base = _load(args.base)
+    new_meta, new = _load(args.new)
+    print(f"base: {base_meta.get('commit')} ({base_meta.get('created_at')})")
+    print(f"novo: {new_meta.get('commit')} ({new_meta.get('created_at')})\n")
+
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        template, size, engine, concurrency = key
+        columns = []
+        for label, getter, higher_is_better in METRICS:
+            old_value, new_value = getter(base[key]), getter(new[key])
+            delta = _delta(old_value, new_value)
+            if delta is None:
+                columns.append(f"{label} {new_value}")
+                continue
+            columns.append(f"{label} {new_value:.1f} ({delta:+.1f}%)")
+            if label == "p50 ms" and args.fail_above is not None and delta > args.fail_above:
+                regressions.append((key, delta))
+        print(f"{template:<18} {size:>6} {engine:<10} c={concurrency}  " + "  ".join(columns))
+
+    for key in sorted(base.keys() ^ new.keys()):
+        print(f"{' '.join(map(str, key))}: presente em apenas um dos resultados")
+
+    if regressions:
+        print(f"\n{len(regressions)} caso(s) com p50 acima de +{args.fail_above}%:")
+        for key, delta in regressions:
+            print(f"  {' '.join(map(str, key))}: {delta:+.1f}%")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+"""
+Teste de carga HTTP da API (httpx assíncrono)
+
+Dois modos:
+- closed loop (padrão): ``--concurrency 1,2,4,8`` clientes, cada um enviando a
+  próxima requisição assim que a anterior termina; um degrau por valor;
+- open loop: ``--rate 2,5,10`` requisições/s com chegadas de Poisson,
+  independentes das respostas. A latência é medida a partir do instante
+  agendado, então a fila no cliente também conta (sem coordinated omission).
+
+Cada degrau reporta vazão, taxa de erros e latências p50/p90/p99 por operação.
+O ponto de saturação é o primeiro degrau em que a vazão deixa de crescer
+(closed loop) ou fica abaixo da taxa oferecida (open loop), o p99 passa de
+``--slo-p99-ms`` ou os erros passam de ``--max-error-rate``.
+
+Uso:
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 1,2,4,8,16
+    python -m benchmarks.load_test --rate 2,5,10 --step-seconds 60 --upload
+    python -m benchmarks.load_test --spawn-api --s3-stub --upload --concurrency 1,4,16
+
+Mix de operações (``--mix``): ``template:formato[:tamanho]=peso``, além de
+``templates=peso`` (GET /templates) e ``download=peso`` (GET /download de um
+documento gerado antes). Os payloads vêm de ``benchmarks.payloads``.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from contextlib import nullcontext
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from .payloads import GENERATORS, ImageServer
+
+DEFAULT_MIX = (
+    "fatura:pdf:10=4,certificado:png=2,fique_de_olho:pdf:10=2,"
+    "catalogo_produtos:pdf:100=1,templates=1,download=1"
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Operation:
+    """Uma entrada do mix: geração de documento, listagem de templates ou download"""
+
+    def __init__(self, spec: str):
+        target, _, weight = spec.partition("=")
+        self.weight = float(weight or 1)
+        self.kind = target if target in ("templates", "download") else "generate"
+        self.name = target
+        if self.kind == "generate":
+            parts = target.split(":")
+            self.template = parts[0]
+            self.format = parts[1] if len(parts) > 1 else "pdf"
+            self.size = int(parts[2]) if len(parts) > 2 else 10
+            if self.template not in GENERATORS:
+                raise ValueError(f"Template desconhecido no mix: {self.template}")
+            self.payload: Optional[Dict[str, Any]] = None
+
+def _parse_mix(spec: str) -> List[Operation]:
+    return [Operation(part.strip()) for part in spec.split(",") if part.strip()]
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return round(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower), 2)
+
+class LoadTest:
+    def __init__(self, args, operations: List[Operation], image_base_url: Optional[str]):
+        self.args = args
+        self.operations = operations
+        self.weights = [op.weight for op in operations]
+        self.rng = random.Random(args.seed)
+        # Arquivos gerados recentemente, alvos das operações de download
+        self.downloads: deque = deque(maxlen=200)
+        self.sequence = 0
+
+        for op in operations:
+            if op.kind == "generate":
+                op.payload = {
+                    "template_name": op.template,
+                    "data": GENERATORS[op.template](
+                        op.size, seed=args.seed, image_base_url=image_base_url
+                    ),
+                    "output_format": op.format,
+                    "upload_to_minio": args.upload,
+                    "response_mode": args.response_mode
+                }
+
+    def _choose(self) -> Operation:
+        op = self.rng.choices(self.operations, self.weights)[0]
+        if op.kind == "download" and not self.downloads:
+            # Ainda não há documento para baixar: gera um
+            generates = [o for o in self.operations if o.kind == "generate"]
+            if generates:
+                return self.rng.choice(generates)
+        return op
+
+    def _payload(self, op: Operation) -> Dict[str, Any]:
+        """
+        Payload da geração; fora da fração ``--repeat-ratio``, um campo extra torna
+        a requisição única, para que o cache de renderização não a responda
+        """
+        if self.rng.random() < self.args.repeat_ratio:
+            return op.payload
+        self.sequence += 1
+        return {**op.payload, "data": {**op.payload["data"], "_load_id": self.sequence}}
+
+    async def _execute(self, client: httpx.AsyncClient, op: Operation) -> Tuple[Optional[int], Optional[str]]:
+        """Executa a operação; retorna (status, erro)"""
+        try:
+            if op.kind == "templates":
+                response = await client.get("/templates")
+            elif op.kind == "download":
+                filename = self.rng.choice(self.downloads) if self.downloads else "inexistente"
+                async with client.stream("GET", f"/download/{filename}") as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+            else:
+                response = await client.post("/generate", json=self._payload(op))
+                if response.status_code == 200 and self.args.response_mode == "json":
+                    result = response.json()
+                    if result.get("local_path"):
+                        self.downloads.append(os.path.basename(result["local_path"]))
+                    if self.args.upload and not result.get("uploaded_to_minio"):
+                        return response.status_code, "upload: " + str(result.get("upload_error"))
+        except httpx.HTTPError as e:
+            return None, type(e).__name__
+        if response.status_code >= 400:
+            return response.status_code, f"HTTP {response.status_code}"
+        return response.status_code, None
+
+    async def run_step(self, client: httpx.AsyncClient, level: float) -> Dict[str, Any]:
+        """Executa um degrau (concorrência ou taxa) por ``--step-seconds``"""
+        samples: List[Tuple[str, float, Optional[str]]] = []
+        duration = self.args.step_seconds
+        start = time.perf_counter()
+        deadline = start + duration
+        dropped = 0
+
+        async def _timed(op: Operation, scheduled: float):
+            _, error = await self._execute(client, op)
+            samples.append((op.name, (time.perf_counter() - scheduled) * 1000, error))
+
+        if self.args.rate:
+            in_flight = set()
+            next_arrival = start
+            while next_arrival < deadline:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if len(in_flight) >= self.args.max_in_flight:
+                    dropped += 1
+                else:
+                    task = asyncio.create_task(_timed(self._choose(), next_arrival))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                next_arrival += self.rng.expovariate(level)
+            if in_flight:
+                await asyncio.wait(in_flight)
+        else:
+            async def _client():
+                while time.perf_counter() < deadline:
+                    await _timed(self._choose(), time.perf_counter())
+
+            await asyncio.gather(*(_client() for _ in range(int(level))))
+
+        elapsed = time.perf_counter() - start
+        return self._summarize(level, samples, elapsed, dropped)
+
+    def _summarize(self, level: float, samples, elapsed: float, dropped: int) -> Dict[str, Any]:
+        by_op: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        for name, latency, error in samples:
+            by_op[name].append(latency)
+            if error:
+                errors[error] += 1
+
+        latencies = [latency for _, latency, _ in samples]
+        error_count = sum(errors.values())
+        return {
+            "level": level,
+            "requests": len(samples),
+            "dropped": dropped,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+            "error_rate": round(error_count / len(samples), 4) if samples else 0.0,
+            "errors": dict(errors),
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p90": _percentile(latencies, 90),
+                "p99": _percentile(latencies, 99),
+                "max": round(max(latencies), 2) if latencies else None
+            },
+            "operations": {
+                name: {
+                    "requests": len(values),
+                    "p50": _percentile(values, 50),
+                    "p99": _percentile(values, 99)
+                }
+                for name, values in sorted(by_op.items())
+            }
+        }
+
+def find_saturation(steps: List[Dict[str, Any]], args) -> Optional[Dict[str, Any]]:
+    """Primeiro degrau saturado, com o motivo"""
+    best = 0.0
+    for step in steps:
+        reasons = []
+        throughput = step["throughput_per_s"]
+        if args.rate:
+            if throughput < step["level"] * 0.9 or step["dropped"]:
+                reasons.append(f"vazão {throughput}/s abaixo da taxa oferecida {step['level']}/s")
+        elif best and throughput < best * (1 + args.min_gain):
+            reasons.append(f"vazão {throughput}/s não cresceu em relação a {best}/s")
+        p99 = step["latency_ms"]["p99"]
+        if args.slo_p99_ms and p99 is not None and p99 > args.slo_p99_ms:
+            reasons.append(f"p99 {p99} ms acima do SLO de {args.slo_p99_ms} ms")
+        if step["error_rate"] > args.max_error_rate:
+            reasons.append(f"taxa de erros {step['error_rate']:.2%}")
+        if reasons:
+            return {"level": step["level"], "reasons": reasons}
+        best = max(best, throughput)
+    return None
+
+def _format_step(step: Dict[str, Any], mode: str) -> str:
+    latency = step["latency_ms"]
+    return (
+        f"{mode} {step['level']:>6}  {step['requests']:>6} req  {step['throughput_per_s']:>8.2f}/s  "
+        f"erros {step['error_rate']:>6.2%}  p50 {latency['p50']} ms  p90 {latency['p90']} ms  "
+        f"p99 {latency['p99']} ms"
+    )
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float, api: Optional[subprocess.Popen] = None):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if api is not None and api.poll() is not None:
+            raise RuntimeError(f"A API terminou durante a inicialização (código {api.returncode})")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"API não ficou pronta em {timeout:.0f}s")
+
+async def run(args, api: Optional[subprocess.Popen] = None) -> Dict[str, Any]:
+    levels = [float(v) for v in (args.rate or args.concurrency).split(",")]
+    mode = "taxa" if args.rate else "clientes"
+    limits = httpx.Limits(
+        max_connections=args.max_in_flight if args.rate else int(max(levels)),
+        max_keepalive_connections=int(max(levels)) if not args.rate else 100
+    )
+
+    # Imagens dos catálogos servidas por este processo, salvo URL informada
+    with nullcontext() if args.image_base_url else ImageServer() as images:
+        load = LoadTest(args, _parse_mix(args.mix), args.image_base_url or images.base_url)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            await _wait_ready(client, args.ready_timeout, api)
+            steps = []
+            for level in levels:
+                step = await load.run_step(client, level)
+                steps.append(step)
+                print(_format_step(step, mode), flush=True)
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "url": args.url,
+            "mode": "open" if args.rate else "closed",
+            "mix": args.mix,
+            "step_seconds": args.step_seconds,
+            "upload_to_minio": args.upload,
+            "response_mode": args.response_mode,
+            "repeat_ratio": args.repeat_ratio,
+            "seed": args.seed
+        },
+        "steps": steps,
+        "saturation": find_saturation(steps, args)
+    }
+
+def _spawn_api(args, env: Dict[str, str]) -> subprocess.Popen:
+    """Sobe a API local com uvicorn (para testes fora de um cluster)"""
+    port = args.url.rsplit(":", 1)[-1].strip("/")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", port,
+         "--workers", str(args.api_workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **env}
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP da API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Degraus de clientes (closed loop)")
+    parser.add_argument("--rate", help="Degraus de requisições/s (open loop), ex.: 2,5,10")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Open loop: requisições simultâneas antes de descartar chegadas")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    parser.add_argument("--upload", action="store_true", help="upload_to_minio nas gerações")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="Fração de gerações com payload repetido (respondidas pelo cache)")
+    parser.add_argument("--response-mode", choices=("json", "stream"), default="json")
+    parser.add_argument("--slo-p99-ms", type=float, help="p99 máximo aceito em um degrau")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="Closed loop: ganho mínimo de vazão para não considerar saturado")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--image-base-url",
+                        help="Base das imagens dos catálogos (padrão: servidor local deste processo)")
+    parser.add_argument("--spawn-api", action="store_true", help="Sobe a API localmente com uvicorn")
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--s3-stub", action="store_true",
+                        help="Com --spawn-api: usa um S3 local em vez do MinIO configurado")
+    parser.add_argument("--output", help="Arquivo JSON (padrão: benchmarks/results/load_<data>.json)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    stub = None
+    api = None
+    try:
+        env = {}
+        if args.s3_stub:
+            from .s3_stub import S3Stub
+            stub = S3Stub().__enter__()
+            env["MINIO_ENDPOINT"] = stub.endpoint
+            env["MINIO_SECURE"] = "False"
+            print(f"S3 local em http://{stub.endpoint}")
+        if args.spawn_api:
+            api = _spawn_api(args, env)
+        elif args.s3_stub:
+            print(f"⚠️  Inicie a API com MINIO_ENDPOINT={stub.endpoint} para usar o S3 local")
+
+        report = asyncio.run(run(args, api))
+        if stub is not None:
+            report["s3_stub"] = stub.stats()
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait(timeout=30)
+        if stub is not None:
+            stub.__exit__(None, None, None)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    saturation = report["saturation"]
+    if saturation:
+        print(f"\nSaturação em {saturation['level']}: " + "; ".join(saturation["reasons"]))
+    else:
+        print("\nSem saturação nos degraus testados")
+    print(f"Resultados em {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
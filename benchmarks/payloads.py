@@ -0,0 +1,181 @@
+"""
+Geradores de payloads sintéticos para os templates
+
+Todos os geradores são determinísticos para uma mesma semente, de modo que
+execuções em versões diferentes do código renderizam exatamente os mesmos dados.
+"""
+
+import random
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional
+
+from PIL import Image, ImageDraw
+
+_PALAVRAS = (
+    "serviço consultoria desenvolvimento suporte licença manutenção integração "
+    "treinamento hospedagem backup migração auditoria monitoramento relatório "
+    "análise projeto implantação customização módulo mensal anual premium"
+).split()
+
+_FABRICANTES = (
+    "MULTILASER", "FISHER PRICE", "PHILIPS", "MONDIAL", "BRITÂNIA", "ELECTROLUX",
+    "TRAMONTINA", "ARNO", "CADENCE", "OSTER", "BLACK+DECKER", "WAP"
+)
+_UNIDADES = ("1UN", "2UN", "EMBALAGEM", "CX", "KIT")
+_CATEGORIAS = (None, None, "Infantil", "Saúde", "Casa", "Eletrônicos")
+_FLAGS = (None, "🇧🇷", "🌎", "📈", "⚡", "🌱")
+
+def _frase(rng: random.Random, palavras: int) -> str:
+    return " ".join(rng.choice(_PALAVRAS) for _ in range(palavras)).capitalize()
+
+def fatura(size: int, seed: int = 42, **_) -> Dict[str, Any]:
+    """Fatura com ``size`` itens"""
+    rng = random.Random(seed)
+    return {
+        "cliente": "Cliente Benchmark LTDA",
+        "numero_fatura": f"FAT-{seed:06d}",
+        "descricao": "Fatura sintética para benchmark",
+        "itens": [
+            {"descricao": _frase(rng, rng.randint(2, 6)), "valor": round(rng.uniform(10, 5000), 2)}
+            for _ in range(size)
+        ]
+    }
+
+def certificado(size: int = 1, seed: int = 42, **_) -> Dict[str, Any]:
+    """Certificado (sempre uma página; ``size`` define o número de palavras do curso)"""
+    rng = random.Random(seed)
+    return {
+        "participante": "Maria Silva Santos",
+        "curso": _frase(rng, max(1, size)),
+        "instrutor": "Prof. Dr. João Rodriguez",
+        "data_conclusao": "04/01/2025",
+        "endereco": "São Paulo, SP, Brasil",
+        "carga_horaria": f"{rng.randint(4, 120)} horas"
+    }
+
+def fique_de_olho(size: int, seed: int = 42, **_) -> Dict[str, Any]:
+    """Boletim com ``size`` notícias"""
+    rng = random.Random(seed)
+    noticias = []
+    for _ in range(size):
+        noticia = {"texto": _frase(rng, rng.randint(6, 16))}
+        flag = rng.choice(_FLAGS)
+        if flag:
+            noticia["flag"] = flag
+        noticias.append(noticia)
+    return {"dia_semana": "Segunda-feira", "lista_noticias": noticias}
+
+def catalogo_produtos(
+    size: int,
+    seed: int = 42,
+    image_base_url: Optional[str] = None,
+    distinct_images: int = 50,
+    **_
+) -> Dict[str, Any]:
+    """
+    Catálogo com ``size`` produtos, em fabricantes de 5 a 40 produtos
+
+    As imagens apontam para ``image_base_url`` (ver ``ImageServer``), com no
+    máximo ``distinct_images`` URLs distintas, como em um catálogo real.
+    """
+    rng = random.Random(seed)
+    fabricantes = []
+    restantes = size
+    while restantes > 0:
+        quantidade = min(restantes, rng.randint(5, 40))
+        restantes -= quantidade
+        produtos = []
+        for _ in range(quantidade):
+            produto = {
+                "codigo_produto": f"{rng.randint(0, 999999):06d}",
+                "nome_produto": _frase(rng, rng.randint(3, 9)).upper(),
+                "preco_sugerido_reais": round(rng.uniform(1, 500), 2),
+                "unidade": rng.choice(_UNIDADES),
+                "descricao_curta": _frase(rng, rng.randint(4, 10)),
+                "url_imagem_placeholder": (
+                    f"{image_base_url}/{rng.randrange(distinct_images)}.png" if image_base_url else ""
+                )
+            }
+            categoria = rng.choice(_CATEGORIAS)
+            if categoria:
+                produto["categoria"] = categoria
+            produtos.append(produto)
+        fabricantes.append({
+            "nome_fabricante": f"{rng.choice(_FABRICANTES)} {len(fabricantes) + 1}",
+            "produtos": produtos
+        })
+    return {
+        "data_geracao": "15/03/2024 14:30",
+        "ano_atual": "2024",
+        "catalogo_fabricantes": fabricantes
+    }
+
+GENERATORS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "fatura": fatura,
+    "certificado": certificado,
+    "fique_de_olho": fique_de_olho,
+    "catalogo_produtos": catalogo_produtos
+}
+
+# Tamanhos padrão (itens, palavras, notícias ou produtos) de cada template
+DEFAULT_SIZES: Dict[str, tuple] = {
+    "fatura": (10, 1000, 10000),
+    "certificado": (10, 100, 1000),
+    "fique_de_olho": (10, 100, 1000),
+    "catalogo_produtos": (10, 1000, 10000)
+}
+
+@lru_cache(maxsize=None)
+def _placeholder_png(index: int) -> bytes:
+    rng = random.Random(index)
+    color = tuple(rng.randint(60, 220) for _ in range(3))
+    image = Image.new("RGB", (300, 200), color)
+    ImageDraw.Draw(image).text((20, 90), f"produto {index}", fill="white")
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        name = self.path.rsplit("/", 1)[-1]
+        try:
+            content = _placeholder_png(int(name.split(".")[0]))
+        except ValueError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class ImageServer:
+    """
+    Servidor HTTP local com as imagens de produtos dos catálogos
+
+    Mantém o benchmark offline e ainda exercita o caminho de download do
+    ``ImageCache``.
+    """
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/img"
+
+    def __enter__(self) -> "ImageServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
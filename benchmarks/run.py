@@ -0,0 +1,263 @@
+"""
+Benchmark offline do DocumentGenerator
+
+Cada caso (template x tamanho x engine) roda em um processo novo, para que o
+pico de memória (RSS) seja do caso e não dos anteriores. Não precisa da API,
+do MinIO nem de internet: as imagens dos catálogos vêm de um servidor HTTP local.
+
+Uso:
+    python -m benchmarks.run
+    python -m benchmarks.run --templates fatura --sizes 10 1000 --engines reportlab pil
+    python -m benchmarks.run --quick --output benchmarks/results/base.json
+
+Compare dois resultados com ``python -m benchmarks.compare``.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from .payloads import DEFAULT_SIZES, GENERATORS, ImageServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Formato gerado por cada engine
+ENGINE_FORMATS = {
+    "weasyprint": "pdf",
+    "reportlab": "pdf",
+    "pil": "png",
+    "pdfium": "png"
+}
+
+class _Skip(Exception):
+    """Engine indisponível neste ambiente"""
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _select_engine(generator, engine: str):
+    """Força a engine do caso sobre as engines detectadas"""
+    generator._ensure_engines()
+    if engine == "weasyprint":
+        if not generator.weasyprint_available:
+            raise _Skip("WeasyPrint indisponível")
+    elif engine == "pdfium":
+        if not generator.raster_available:
+            raise _Skip("WeasyPrint/pypdfium2 indisponíveis")
+    elif engine == "reportlab":
+        generator.weasyprint_available = False
+        generator.raster_available = False
+        generator._setup_reportlab()
+        if not generator.reportlab_available:
+            raise _Skip("ReportLab indisponível")
+    elif engine == "pil":
+        generator.raster_available = False
+    else:
+        raise _Skip(f"Engine desconhecida: {engine}")
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa um caso; roda em um processo dedicado"""
+    os.chdir(ROOT)
+    # Caches isolados por caso e nenhum acesso à rede para assets dos templates
+    scratch = tempfile.mkdtemp(prefix="bench_")
+    os.environ["IMAGE_CACHE_DIR"] = os.path.join(scratch, "images")
+    os.environ["ASSET_CACHE_DIR"] = os.path.join(scratch, "assets")
+    os.environ["ASSET_OFFLINE"] = "true"
+
+    from app.services.document_generator import DocumentGenerator
+    from app.services.metrics import render_context, stage_log
+
+    result = {key: case[key] for key in ("template", "size", "engine", "concurrency")}
+    result["format"] = ENGINE_FORMATS[case["engine"]]
+
+    generator = DocumentGenerator()
+    try:
+        _select_engine(generator, case["engine"])
+    except _Skip as e:
+        generator.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+        return {**result, "skipped": str(e)}
+
+    data = GENERATORS[case["template"]](
+        case["size"], seed=case["seed"], image_base_url=case.get("image_base_url")
+    )
+
+    async def _render_one():
+        with render_context(case["template"], result["format"]), stage_log() as stages:
+            start = time.perf_counter()
+            content = await generator.render_to_bytes(case["template"], data, result["format"])
+            return time.perf_counter() - start, len(content), list(stages)
+
+    async def _run():
+        # Aquecimento: templates, fontes e cache de imagens
+        for _ in range(case["warmup"]):
+            await _render_one()
+        baseline_rss = _peak_rss_mb()
+
+        semaphore = asyncio.Semaphore(case["concurrency"])
+        samples = []
+        deadline = time.perf_counter() + case["max_seconds"]
+
+        async def _worker():
+            while len(samples) < case["iterations"] and (not samples or time.perf_counter() < deadline):
+                async with semaphore:
+                    samples.append(await _render_one())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_worker() for _ in range(case["concurrency"])))
+        return baseline_rss, samples, time.perf_counter() - start
+
+    try:
+        baseline_rss, samples, wall = asyncio.run(_run())
+    except Exception as e:
+        return {**result, "error": str(e)}
+    finally:
+        generator.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    latencies = [s[0] * 1000 for s in samples]
+    stage_totals: Dict[str, float] = {}
+    for _, _, stages in samples:
+        for name, seconds in stages:
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds * 1000
+
+    result.update({
+        "iterations": len(samples),
+        "throughput_per_s": round(len(samples) / wall, 3),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "mean": round(statistics.fmean(latencies), 2),
+            "min": round(min(latencies), 2),
+            "max": round(max(latencies), 2)
+        },
+        "output_bytes": samples[-1][1],
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages_ms": {name: round(total / len(samples), 2) for name, total in stage_totals.items()}
+    })
+    return result
+
+def _metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    from importlib import metadata
+
+    versions = {}
+    for package in ("weasyprint", "reportlab", "pillow", "pypdfium2", "pypdf", "jinja2"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "render_backend": os.getenv("RENDER_BACKEND", "thread"),
+        "seed": args.seed,
+        "versions": versions
+    }
+
+def _format_row(result: Dict[str, Any]) -> str:
+    case = f"{result['template']:<18} {result['size']:>6} {result['engine']:<10}"
+    if "skipped" in result:
+        return f"{case} ignorado: {result['skipped']}"
+    if "error" in result:
+        return f"{case} erro: {result['error']}"
+    latency = result["latency_ms"]
+    return (
+        f"{case} p50 {latency['p50']:>9.1f} ms  p99 {latency['p99']:>9.1f} ms  "
+        f"{result['throughput_per_s']:>7.2f}/s  {result['output_bytes'] / 1024:>9.1f} KB  "
+        f"RSS {result['peak_rss_mb']} MB"
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline do DocumentGenerator")
+    parser.add_argument("--templates", nargs="+", choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, help="Tamanhos (padrão: os de cada template)")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINE_FORMATS),
+                        default=["weasyprint", "reportlab", "pil"])
+    parser.add_argument("--iterations", type=int, default=5, help="Renderizações medidas por caso")
+    parser.add_argument("--warmup", type=int, default=1, help="Renderizações descartadas por caso")
+    parser.add_argument("--max-seconds", type=float, default=60,
+                        help="Tempo máximo por caso (mede ao menos uma renderização)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Renderizações simultâneas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="Somente o menor tamanho de cada template")
+    parser.add_argument("--output", help="Arquivo JSON (padrão: benchmarks/results/<data>.json)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    with ImageServer() as images:
+        for template in args.templates:
+            sizes = args.sizes or DEFAULT_SIZES[template]
+            if args.quick:
+                sizes = sizes[:1]
+            for size in sizes:
+                for engine in args.engines:
+                    case = {
+                        "template": template,
+                        "size": size,
+                        "engine": engine,
+                        "concurrency": args.concurrency,
+                        "iterations": args.iterations,
+                        "warmup": args.warmup,
+                        "max_seconds": args.max_seconds,
+                        "seed": args.seed,
+                        "image_base_url": images.base_url
+                    }
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                        try:
+                            result = pool.submit(run_case, case).result()
+                        except Exception as e:
+                            result = {**case, "error": str(e)}
+                            result.pop("image_base_url")
+                    results.append(result)
+                    print(_format_row(result), flush=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _metadata(args), "results": results}, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {output}")
+    return 1 if any("error" in r for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
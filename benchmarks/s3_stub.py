@@ -0,0 +1,245 @@
+"""
+Substituto local e mínimo de um servidor S3/MinIO para testes de carga
+
+Atende às chamadas usadas pelo ``MinIOService`` (bucket, PUT simples e
+multipart, HEAD/GET/DELETE de objetos e listagem) sem validar assinaturas.
+Os objetos ficam em memória; com ``discard=True`` só os metadados são
+guardados, para testes longos.
+
+Uso avulso:
+    python -m benchmarks.s3_stub --port 9000
+    MINIO_ENDPOINT=127.0.0.1:9000 uvicorn app.main:app
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+class _Store:
+    def __init__(self, discard: bool):
+        self.discard = discard
+        self.buckets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+
+    def put(self, bucket: str, key: str, body: bytes, content_type: Optional[str]) -> str:
+        etag = hashlib.md5(body).hexdigest()
+        with self.lock:
+            self.buckets.setdefault(bucket, {})[key] = {
+                "body": None if self.discard else body,
+                "size": len(body),
+                "etag": etag,
+                "content_type": content_type or "application/octet-stream",
+                "modified": time.time()
+            }
+        return etag
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: _Store
+
+    def log_message(self, format, *args):
+        pass
+
+    def _split(self):
+        parsed = urlparse(self.path)
+        parts = unquote(parsed.path).lstrip("/").split("/", 1)
+        bucket = parts[0]
+        key = parts[1] if len(parts) > 1 and parts[1] else None
+        query = {k: v[0] for k, v in parse_qs(parsed.query, keep_blank_values=True).items()}
+        with self.store.lock:
+            self.store.requests += 1
+        return bucket, key, query
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with self.store.lock:
+            self.store.bytes_received += len(body)
+        return body
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _xml(self, status: int, xml: str):
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n' + xml).encode()
+        self._send(status, body, {"Content-Type": "application/xml"})
+
+    def _error(self, status: int, code: str, resource: str):
+        self._xml(status, (
+            f"<Error><Code>{code}</Code><Message>{code}</Message>"
+            f"<Resource>{escape(resource)}</Resource><RequestId>stub</RequestId>"
+            f"<HostId>stub</HostId></Error>"
+        ))
+
+    def do_HEAD(self):
+        bucket, key, _ = self._split()
+        objects = self.store.buckets.get(bucket)
+        if objects is None:
+            return self._send(404)
+        if key is None:
+            return self._send(200)
+        obj = objects.get(key)
+        if obj is None:
+            return self._send(404)
+        # HEAD não tem corpo, mas Content-Length reflete o tamanho do objeto
+        self.send_response(200)
+        for name, value in self._object_headers(obj).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(obj["size"]))
+        self.end_headers()
+
+    def _object_headers(self, obj: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            "ETag": f'"{obj["etag"]}"',
+            "Content-Type": obj["content_type"],
+            "Last-Modified": formatdate(obj["modified"], usegmt=True)
+        }
+
+    def do_GET(self):
+        bucket, key, query = self._split()
+        if key is None:
+            if "location" in query:
+                return self._xml(200, f'<LocationConstraint xmlns="{_NS}"></LocationConstraint>')
+            objects = self.store.buckets.get(bucket)
+            if objects is None:
+                return self._error(404, "NoSuchBucket", f"/{bucket}")
+            prefix = query.get("prefix", "")
+            contents = "".join(
+                f"<Contents><Key>{escape(name)}</Key><Size>{obj['size']}</Size>"
+                f"<ETag>&quot;{obj['etag']}&quot;</ETag>"
+                f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(obj['modified']))}</LastModified>"
+                f"</Contents>"
+                for name, obj in sorted(objects.items()) if name.startswith(prefix)
+            )
+            return self._xml(200, (
+                f'<ListBucketResult xmlns="{_NS}"><Name>{escape(bucket)}</Name>'
+                f"<Prefix>{escape(prefix)}</Prefix><KeyCount>{contents.count('<Contents>')}</KeyCount>"
+                f"<IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+            ))
+
+        obj = self.store.buckets.get(bucket, {}).get(key)
+        if obj is None:
+            return self._error(404, "NoSuchKey", f"/{bucket}/{key}")
+        body = obj["body"] if obj["body"] is not None else bytes(obj["size"])
+        self._send(200, body, self._object_headers(obj))
+
+    def do_PUT(self):
+        bucket, key, query = self._split()
+        body = self._body()
+        if key is None:
+            with self.store.lock:
+                self.store.buckets.setdefault(bucket, {})
+            return self._send(200)
+        if bucket not in self.store.buckets:
+            return self._error(404, "NoSuchBucket", f"/{bucket}")
+
+        if "uploadId" in query:
+            with self.store.lock:
+                parts = self.store.uploads.get(query["uploadId"])
+                if parts is None:
+                    return self._error(404, "NoSuchUpload", f"/{bucket}/{key}")
+                parts[int(query["partNumber"])] = body
+            return self._send(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+        etag = self.store.put(bucket, key, body, self.headers.get("Content-Type"))
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def do_POST(self):
+        bucket, key, query = self._split()
+        self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self.store.lock:
+                self.store.uploads[upload_id] = {}
+            return self._xml(200, (
+                f'<InitiateMultipartUploadResult xmlns="{_NS}"><Bucket>{escape(bucket)}</Bucket>'
+                f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            ))
+        if "uploadId" in query:
+            with self.store.lock:
+                parts = self.store.uploads.pop(query["uploadId"], None)
+            if parts is None:
+                return self._error(404, "NoSuchUpload", f"/{bucket}/{key}")
+            body = b"".join(parts[number] for number in sorted(parts))
+            etag = self.store.put(bucket, key, body, None)
+            return self._xml(200, (
+                f'<CompleteMultipartUploadResult xmlns="{_NS}"><Bucket>{escape(bucket)}</Bucket>'
+                f'<Key>{escape(key)}</Key><ETag>&quot;{etag}&quot;</ETag></CompleteMultipartUploadResult>'
+            ))
+        self._error(400, "NotImplemented", self.path)
+
+    def do_DELETE(self):
+        bucket, key, query = self._split()
+        if "uploadId" in query:
+            with self.store.lock:
+                self.store.uploads.pop(query["uploadId"], None)
+        elif key is not None:
+            with self.store.lock:
+                self.store.buckets.get(bucket, {}).pop(key, None)
+        self._send(204)
+
+class S3Stub:
+    """Servidor S3 local em uma thread; use como gerenciador de contexto"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, discard: bool = True):
+        self.store = _Store(discard)
+        handler = type("Handler", (_Handler,), {"store": self.store})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self.store.lock:
+            return {
+                "requests": self.store.requests,
+                "bytes_received": self.store.bytes_received,
+                "objects": sum(len(objects) for objects in self.store.buckets.values())
+            }
+
+    def __enter__(self) -> "S3Stub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor S3 local para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--keep-bodies", action="store_true", help="Guarda o conteúdo dos objetos")
+    args = parser.parse_args()
+
+    with S3Stub(args.host, args.port, discard=not args.keep_bodies) as stub:
+        print(f"S3 local em http://{stub.endpoint} (Ctrl+C para sair)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            print(stub.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Testes do cache de recursos remotos do AssetStore
+
+As respostas HTTP são simuladas; não dependem da rede nem da API rodando.
+"""
+
+import os
+import time
+import tempfile
+
+import requests
+
+from app.services.asset_store import AssetStore
+
+
+class _Response:
+    headers = {"Content-Type": "image/png"}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def _store(directory, max_bytes):
+    return AssetStore(asset_dirs=[directory], cache_dir=directory, max_bytes=max_bytes)
+
+
+def test_disco_respeita_limite():
+    """Testa que os recursos menos usados são apagados ao passar do limite em disco"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory, 5000)
+        store.session.get = lambda url, **kwargs: _Response(b"x" * 1000)
+        for number in range(10):
+            store.url_fetcher(f"http://cdn.exemplo/{number}.png")
+
+        stats = store.stats()
+        assert stats["disk_bytes"] <= 5000
+        assert stats["disk_evictions"] == 10 - stats["disk_entries"]
+        assert len([name for name in os.listdir(directory) if name.endswith(".bin")]) == stats["disk_entries"]
+        # O mais recente continua em disco
+        assert store.url_fetcher("http://cdn.exemplo/9.png")["string"] == b"x" * 1000
+
+
+def test_host_indisponivel_expira():
+    """Testa que hosts saem de _down_hosts após o intervalo ou com uma busca bem-sucedida"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory, 10**6)
+
+        def _offline(url, **kwargs):
+            raise requests.exceptions.ConnectionError("sem rota")
+
+        store.session.get = _offline
+        for host in ("a.exemplo", "b.exemplo"):
+            try:
+                store.url_fetcher(f"http://{host}/logo.png")
+            except Exception:
+                pass
+        assert store.stats()["down_hosts"] == 2
+
+        # a.exemplo venceu; b.exemplo volta a responder
+        store._down_hosts["a.exemplo"] = time.time() - 1
+        store._down_hosts["b.exemplo"] = time.time() - 1
+        store.session.get = lambda url, **kwargs: _Response(b"ok")
+        store.url_fetcher("http://b.exemplo/logo.png")
+
+        assert store.stats()["down_hosts"] == 0
+
+
+if __name__ == "__main__":
+    test_disco_respeita_limite()
+    test_host_indisponivel_expira()
+    print("✅ AssetStore: todos os testes passaram")
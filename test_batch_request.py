@@ -0,0 +1,34 @@
+"""
+Testes do limite de itens de POST /generate/batch
+
+Usam o TestClient do FastAPI; a validação rejeita o lote antes de qualquer
+renderização, então não dependem de WeasyPrint nem do MinIO.
+"""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.generate_request import BATCH_MAX_ITEMS
+
+ITEM = {"template_name": "fatura", "data": {"cliente": "Teste"}}
+
+
+def test_lote_acima_do_limite():
+    """Testa que um lote com mais de BATCH_MAX_ITEMS itens responde 422"""
+    client = TestClient(app)
+    response = client.post("/generate/batch", json={"items": [ITEM] * (BATCH_MAX_ITEMS + 1)})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "items"]
+
+
+def test_lote_vazio():
+    """Testa que um lote sem itens responde 422"""
+    client = TestClient(app)
+    assert client.post("/generate/batch", json={"items": []}).status_code == 422
+
+
+if __name__ == "__main__":
+    test_lote_acima_do_limite()
+    test_lote_vazio()
+    print("✅ /generate/batch: todos os testes passaram")
@@ -0,0 +1,115 @@
+"""
+Testes do DownloadService (Range e requisições condicionais)
+
+Não dependem da API rodando: exercitam diretamente a interpretação dos
+cabeçalhos ``Range``, ``If-None-Match`` e ``If-Modified-Since``.
+"""
+
+import os
+import tempfile
+from email.utils import formatdate
+
+from starlette.requests import Request
+
+from app.services.download_service import DownloadService
+
+ETAG = '"1a-400-17f"'
+MTIME = 1700000000.0
+
+
+def _service():
+    return DownloadService({"pdf": "application/pdf"})
+
+
+def _request(method="GET", **headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": method, "path": "/", "headers": raw})
+
+
+def test_parse_range_intervalos():
+    """Testa os formatos de intervalo único aceitos"""
+    service = _service()
+    assert service._parse_range("bytes=0-99", 1000) == (0, 99)
+    assert service._parse_range("bytes=900-", 1000) == (900, 999)
+    assert service._parse_range("bytes=-100", 1000) == (900, 999)
+    # Fim além do arquivo é truncado; sufixo maior que o arquivo pega tudo
+    assert service._parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert service._parse_range("bytes=-5000", 1000) == (0, 999)
+    assert service._parse_range(" BYTES = 10 - 20 ", 1000) == (10, 20)
+
+
+def test_parse_range_ignorado():
+    """Testa cabeçalhos que devem ser ignorados (resposta 200 com o arquivo inteiro)"""
+    service = _service()
+    assert service._parse_range("bytes=0-1,5-9", 1000) is None
+    assert service._parse_range("items=0-10", 1000) is None
+    assert service._parse_range("bytes=-", 1000) is None
+    assert service._parse_range("bytes=50-10", 1000) is None
+
+
+def test_parse_range_nao_satisfazivel():
+    """Testa intervalos sem bytes no arquivo (416)"""
+    service = _service()
+    assert service._parse_range("bytes=1000-", 1000) is False
+    assert service._parse_range("bytes=2000-3000", 1000) is False
+    assert service._parse_range("bytes=-0", 1000) is False
+    assert service._parse_range("bytes=-10", 0) is False
+
+
+def test_not_modified_if_none_match():
+    """Testa If-None-Match com comparação fraca, lista e curinga"""
+    service = _service()
+    assert service._not_modified(_request(if_none_match=ETAG), ETAG, MTIME)
+    assert service._not_modified(_request(if_none_match=f"W/{ETAG}"), ETAG, MTIME)
+    assert service._not_modified(_request(if_none_match=f'"outro", {ETAG}'), ETAG, MTIME)
+    assert service._not_modified(_request(if_none_match="*"), ETAG, MTIME)
+    assert not service._not_modified(_request(if_none_match='"outro"'), ETAG, MTIME)
+
+
+def test_not_modified_if_modified_since():
+    """Testa If-Modified-Since e sua precedência menor que If-None-Match"""
+    service = _service()
+    same = formatdate(MTIME, usegmt=True)
+    before = formatdate(MTIME - 60, usegmt=True)
+    assert service._not_modified(_request(if_modified_since=same), ETAG, MTIME + 0.5)
+    assert not service._not_modified(_request(if_modified_since=before), ETAG, MTIME)
+    assert not service._not_modified(_request(if_modified_since="data inválida"), ETAG, MTIME)
+    # Com If-None-Match presente, If-Modified-Since é ignorado
+    assert not service._not_modified(
+        _request(if_none_match='"outro"', if_modified_since=same), ETAG, MTIME
+    )
+    assert not service._not_modified(_request(), ETAG, MTIME)
+
+
+def test_sendfile_sem_content_length_zero():
+    """Testa que a resposta delegada ao proxy não declara Content-Length 0 e que HEAD traz o tamanho real"""
+    service = _service()
+    service.sendfile_header = "X-Accel-Redirect"
+    service.sendfile_prefix = "/protected/temp"
+    service.sendfile_min_bytes = 1024
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "doc.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF" + b"x" * 4096)
+
+        response = service.respond(_request(), path, "doc.pdf")
+        assert response.status_code == 200
+        assert response.headers["x-accel-redirect"] == "/protected/temp/doc.pdf"
+        assert "content-length" not in response.headers
+        assert response.body == b""
+
+        head = service.respond(_request("HEAD"), path, "doc.pdf")
+        assert "x-accel-redirect" not in head.headers
+        assert head.headers["content-length"] == str(os.path.getsize(path))
+        assert service.stats()["offloaded"] == 1
+
+
+if __name__ == "__main__":
+    test_parse_range_intervalos()
+    test_parse_range_ignorado()
+    test_parse_range_nao_satisfazivel()
+    test_not_modified_if_none_match()
+    test_not_modified_if_modified_since()
+    test_sendfile_sem_content_length_zero()
+    print("✅ DownloadService: todos os testes passaram")
@@ -0,0 +1,99 @@
+"""
+Testes do limite do cache de imagens em disco
+
+As respostas HTTP são simuladas; não dependem da rede nem da API rodando.
+"""
+
+import os
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from app.services.image_cache import ImageCache
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def _png(seed):
+    img = Image.effect_noise((40, 40), 64 + seed)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _cache(directory, max_disk_bytes):
+    cache = ImageCache(cache_dir=directory, max_memory_bytes=1, max_disk_bytes=max_disk_bytes)
+    cache.session.get = lambda url, **kwargs: _Response(_png(int(url.rsplit("/", 1)[-1])))
+    return cache
+
+
+def _entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".png"))
+
+
+def test_disco_respeita_limite():
+    """Testa que as imagens menos usadas são apagadas ao passar do limite em disco"""
+    with tempfile.TemporaryDirectory() as directory:
+        probe = _cache(directory, 10**9)
+        probe.get("http://imagens/0")
+        entry_bytes = probe.stats()["disk_bytes"]
+
+        cache = _cache(directory, int(entry_bytes * 3.5))
+        for number in range(1, 10):
+            cache.get(f"http://imagens/{number}")
+
+        stats = cache.stats()
+        assert stats["disk_entries"] == 3
+        assert stats["disk_bytes"] <= cache.max_disk_bytes
+        assert stats["disk_evictions"] == 7
+        assert len(_entries(directory)) == 3
+        assert len(os.listdir(directory)) == 6  # .png + .json por entrada
+
+
+def test_disco_lru():
+    """Testa que uma imagem lida do disco volta ao fim da fila de remoção"""
+    with tempfile.TemporaryDirectory() as directory:
+        probe = _cache(directory, 10**9)
+        probe.get("http://imagens/0")
+        entry_bytes = probe.stats()["disk_bytes"]
+        key = probe._key("http://imagens/0", (300, 200))
+
+        cache = _cache(directory, int(entry_bytes * 2.5))
+        cache.get("http://imagens/1")
+        cache.get("http://imagens/0")  # do disco (memória limitada a 1 byte)
+        cache.get("http://imagens/2")
+
+        assert cache.stats()["disk_hits"] == 1
+        assert os.path.exists(os.path.join(directory, f"{key}.png"))
+        assert cache.stats()["disk_entries"] == 2
+
+
+def test_limite_aplicado_na_inicializacao():
+    """Testa que um diretório deixado por outra execução é reduzido ao limite"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = _cache(directory, 10**9)
+        for number in range(6):
+            cache.get(f"http://imagens/{number}")
+        entry_bytes = cache.stats()["disk_bytes"] // 6
+
+        restarted = _cache(directory, int(entry_bytes * 2.5))
+
+        assert restarted.stats()["disk_entries"] == 2
+        assert len(_entries(directory)) == 2
+
+
+if __name__ == "__main__":
+    test_disco_respeita_limite()
+    test_disco_lru()
+    test_limite_aplicado_na_inicializacao()
+    print("✅ ImageCache: todos os testes passaram")
@@ -0,0 +1,84 @@
+"""
+Testes do envio único por objeto (MinIOService._store_once)
+
+O MinIO é simulado; não dependem do MinIO nem da API rodando.
+"""
+
+import asyncio
+
+from app.services.minio_service import MinIOService
+
+
+def _service():
+    service = MinIOService()
+
+    async def object_exists(object_name):
+        return False
+
+    async def presign_url(object_name):
+        return f"http://minio/{object_name}"
+
+    service.object_exists = object_exists
+    service.presign_url = presign_url
+    return service
+
+
+def test_cancelamento_nao_propaga_para_quem_aguarda():
+    """Testa que, se a requisição que envia for cancelada, a que aguarda faz o envio"""
+    async def run():
+        service = _service()
+        uploads = []
+        blocked = asyncio.Event()
+
+        async def upload_blocked():
+            uploads.append("primeira")
+            blocked.set()
+            await asyncio.sleep(3600)
+
+        async def upload():
+            uploads.append("segunda")
+            return "http://minio/documents/a.pdf"
+
+        first = asyncio.create_task(service._store_once("documents/a.pdf", 10, upload_blocked))
+        await blocked.wait()
+        second = asyncio.create_task(service._store_once("documents/a.pdf", 10, upload))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "http://minio/documents/a.pdf"
+        assert first.cancelled()
+        assert uploads == ["primeira", "segunda"]
+        assert not service._inflight
+
+    asyncio.run(run())
+
+
+def test_erro_do_envio_chega_a_quem_aguarda():
+    """Testa que uma falha do envio é repassada a quem aguarda o mesmo objeto"""
+    async def run():
+        service = _service()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def upload_failing():
+            started.set()
+            await release.wait()
+            raise RuntimeError("falha no envio")
+
+        first = asyncio.create_task(service._store_once("documents/b.pdf", 10, upload_failing))
+        await started.wait()
+        second = asyncio.create_task(service._store_once("documents/b.pdf", 10, upload_failing))
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not service._inflight
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_cancelamento_nao_propaga_para_quem_aguarda()
+    test_erro_do_envio_chega_a_quem_aguarda()
+    print("✅ MinIOService: todos os testes passaram")
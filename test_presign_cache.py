@@ -0,0 +1,59 @@
+"""
+Testes do cache de URLs pré-assinadas (PresignedUrlCache)
+
+Não dependem do MinIO nem da API rodando.
+"""
+
+import time
+
+from app.services.minio_service import PresignedUrlCache
+
+
+def test_reaproveita_ate_margem_de_renovacao():
+    """Testa que a URL é reaproveitada só enquanto faltar mais que refresh_seconds"""
+    cache = PresignedUrlCache(max_entries=10, refresh_seconds=3600)
+    now = time.time()
+    cache.put("documents/a.pdf", "http://minio/a", now + 7200)
+    cache.put("documents/b.pdf", "http://minio/b", now + 1800)
+
+    assert cache.get("documents/a.pdf") == ("http://minio/a", now + 7200)
+    # Expira em menos que a margem: precisa ser assinada de novo
+    assert cache.get("documents/b.pdf") is None
+    assert cache.get("documents/c.pdf") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_renovacao_substitui_url():
+    """Testa que um novo put substitui a URL prestes a expirar"""
+    cache = PresignedUrlCache(max_entries=10, refresh_seconds=3600)
+    now = time.time()
+    cache.put("documents/a.pdf", "http://minio/antiga", now + 60)
+    assert cache.get("documents/a.pdf") is None
+
+    cache.put("documents/a.pdf", "http://minio/nova", now + 7200)
+    assert cache.get("documents/a.pdf")[0] == "http://minio/nova"
+    assert len(cache) == 1
+
+
+def test_lru_e_discard():
+    """Testa o limite de entradas (LRU) e a remoção explícita"""
+    cache = PresignedUrlCache(max_entries=2, refresh_seconds=0)
+    expires = time.time() + 3600
+    cache.put("a", "url-a", expires)
+    cache.put("b", "url-b", expires)
+    assert cache.get("a") is not None  # "a" passa a ser o mais recente
+    cache.put("c", "url-c", expires)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache.discard("a")
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+if __name__ == "__main__":
+    test_reaproveita_ate_margem_de_renovacao()
+    test_renovacao_substitui_url()
+    test_lru_e_discard()
+    print("✅ PresignedUrlCache: todos os testes passaram")
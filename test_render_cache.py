@@ -0,0 +1,103 @@
+"""
+Testes das evictions do RenderCache
+
+Usam arquivos em um diretório temporário; não dependem da API rodando.
+"""
+
+import os
+import time
+import tempfile
+
+from app.services.render_cache import RenderCache
+
+
+def _file(directory, name, size):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_eviction_por_entradas():
+    """Testa que a entrada menos usada sai ao passar de max_entries"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(max_entries=2, max_bytes=10_000, ttl_seconds=3600)
+        cache.put("a", _file(directory, "a.pdf", 10))
+        cache.put("b", _file(directory, "b.pdf", 10))
+        assert cache.get("a") is not None  # "a" passa a ser o mais recente
+        cache.put("c", _file(directory, "c.pdf", 10))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_por_bytes():
+    """Testa que entradas antigas saem até o total caber em max_bytes"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(max_entries=100, max_bytes=250, ttl_seconds=3600)
+        for name in ("a", "b", "c"):
+            cache.put(name, _file(directory, f"{name}.pdf", 100))
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["total_bytes"] == 200
+        assert cache.get("a") is None
+
+
+def test_eviction_por_ttl():
+    """Testa que entradas expiradas não são retornadas e saem na próxima inserção"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(max_entries=100, max_bytes=10_000, ttl_seconds=60)
+        cache.put("a", _file(directory, "a.pdf", 10))
+        cache.put("b", _file(directory, "b.pdf", 10))
+        cache._entries["a"]["created_at"] = time.time() - 120
+
+        cache.put("c", _file(directory, "c.pdf", 10))
+        assert cache.stats()["entries"] == 2
+        assert cache.stats()["evictions"] == 1
+
+        cache._entries["b"]["created_at"] = time.time() - 120
+        assert cache.get("b") is None
+        assert cache.stats()["entries"] == 1
+
+
+def test_arquivo_removido_sem_minio():
+    """Testa que a entrada sem arquivo local só sobrevive se houver cópia no MinIO"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(max_entries=100, max_bytes=10_000, ttl_seconds=3600)
+        local = _file(directory, "a.pdf", 10)
+        remote = _file(directory, "b.pdf", 10)
+        cache.put("a", local)
+        cache.put("b", remote, minio_url="http://minio/b.pdf", object_name="documents/b.pdf")
+        os.remove(local)
+        os.remove(remote)
+
+        assert cache.get("a") is None
+        entry = cache.get("b")
+        assert entry["local_path"] is None
+        assert entry["minio_url"] == "http://minio/b.pdf"
+
+
+def test_limites_zero_sao_respeitados():
+    """Testa que 0 explícito não é trocado pelo padrão das variáveis de ambiente"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(max_entries=0, max_bytes=10_000, ttl_seconds=3600)
+        assert cache.max_entries == 0
+        cache.put("a", _file(directory, "a.pdf", 10))
+        assert cache.get("a") is None
+
+        cache = RenderCache(max_entries=100, max_bytes=10_000, ttl_seconds=0)
+        assert cache.ttl_seconds == 0
+        cache.put("b", _file(directory, "b.pdf", 10))
+        time.sleep(0.01)
+        assert cache.get("b") is None
+
+
+if __name__ == "__main__":
+    test_eviction_por_entradas()
+    test_eviction_por_bytes()
+    test_eviction_por_ttl()
+    test_arquivo_removido_sem_minio()
+    test_limites_zero_sao_respeitados()
+    print("✅ RenderCache: todos os testes passaram")
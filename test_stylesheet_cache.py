@@ -0,0 +1,53 @@
+"""
+Testes da extração dos blocos <style> dos templates (StylesheetCache)
+
+O CSS extraído é passado ao WeasyPrint com origem *user*; só pode ser extraído
+quando isso não muda a cascata. Não dependem do WeasyPrint instalado.
+"""
+
+import os
+import tempfile
+
+from app.services.stylesheet_cache import STYLE_BLOCK_RE, StylesheetCache, extractable
+
+TEMPLATES_DIR = os.path.join("app", "templates", "html")
+
+
+def _extractable(source):
+    return extractable(source, STYLE_BLOCK_RE.findall(source))
+
+
+def test_important_nao_e_extraido():
+    """Testa que um bloco com !important continua inline (a precedência se inverteria)"""
+    assert not _extractable("<style>p { color: red !important; }</style><p>x</p>")
+    assert not _extractable("<style>p { color: red ! IMPORTANT }</style>")
+    assert not _extractable("<style>h1 { margin: 0 }</style><style>p { color: red!important }</style>")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "doc.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("<html><head><style>p { color: red !important; }</style></head></html>")
+        # Retorna antes de importar o WeasyPrint
+        assert StylesheetCache(directory, asset_store=None)._parse(path, None) == []
+
+
+def test_outras_folhas_de_autor_nao_sao_extraidas():
+    """Testa que templates com <link> ou <style> com atributos continuam inline"""
+    assert not _extractable('<link rel="stylesheet" href="base.css"><style>p { color: red }</style>')
+    assert not _extractable('<style media="print">p { color: red }</style>')
+    assert not _extractable("<style>p { color: {{ cor }} }</style>")
+    assert _extractable('<style>p { color: red }</style><p style="color: blue">x</p>')
+
+
+def test_templates_atuais_sao_extraidos():
+    """Testa que os templates com CSS estático continuam no caminho com CSS em cache"""
+    for name in ("fatura", "certificado"):
+        with open(os.path.join(TEMPLATES_DIR, f"{name}.html"), encoding="utf-8") as f:
+            assert _extractable(f.read()), name
+
+
+if __name__ == "__main__":
+    test_important_nao_e_extraido()
+    test_outras_folhas_de_autor_nao_sao_extraidas()
+    test_templates_atuais_sao_extraidos()
+    print("✅ StylesheetCache: todos os testes passaram")
@@ -0,0 +1,102 @@
+"""
+Testes da limpeza do TempFileStore
+
+Usam um diretório temporário próprio; não dependem da API rodando.
+"""
+
+import os
+import time
+import tempfile
+
+from app.services.temp_store import TempFileStore
+
+
+def _store(directory, **limits):
+    # min_free_bytes=0 desliga o critério de espaço em disco
+    store = TempFileStore(directory, extensions=("pdf",), min_free_bytes=0, **limits)
+    store.grace_seconds = 0
+    return store
+
+
+def _write(store, size, last_access):
+    path = store.allocate("doc", "pdf")[0]
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    store.commit([path])
+    store._entries[os.path.basename(path)][1] = last_access
+    return path
+
+
+def test_sweep_por_idade():
+    """Testa a remoção de arquivos e reservas abandonadas mais antigos que o limite"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory, max_age_seconds=60)
+        now = time.time()
+        old = _write(store, 10, now - 120)
+        recent = _write(store, 10, now)
+        pending = store.allocate("doc", "pdf")[0]
+        store._entries[os.path.basename(pending)][1] = now - 120
+
+        removed = store.sweep()
+
+        assert removed["age"] == 2
+        assert not os.path.exists(old) and not os.path.exists(pending)
+        assert os.path.exists(recent)
+        assert store.stats()["bytes"] == 10
+
+
+def test_sweep_por_tamanho_lru():
+    """Testa a remoção dos menos usados até a marca inferior do limite de tamanho"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory, max_bytes=1000)
+        now = time.time()
+        paths = [_write(store, 300, now - 100 + i) for i in range(4)]
+        # O primeiro foi acessado por último: sai do começo do LRU
+        store._entries[os.path.basename(paths[0])][1] = now
+
+        removed = store.sweep()
+
+        # 1200 bytes, alvo 800: removem-se os dois menos usados
+        assert removed["size"] == 2
+        assert [os.path.exists(path) for path in paths] == [True, False, False, True]
+        assert store.stats()["bytes"] == 600
+        assert store.stats()["evicted_bytes"] == 600
+
+
+def test_sweep_respeita_carencia():
+    """Testa que arquivos acessados dentro do período de carência não são removidos"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory, max_bytes=100)
+        store.grace_seconds = 30
+        now = time.time()
+        old = _write(store, 80, now - 60)
+        fresh = _write(store, 80, now)
+
+        removed = store.sweep()
+
+        assert removed["size"] == 1
+        assert not os.path.exists(old)
+        assert os.path.exists(fresh)
+
+
+def test_scan_ignora_arquivos_nao_gerenciados():
+    """Testa que caches e outras extensões no diretório não entram na contagem"""
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, ".image_cache"))
+        with open(os.path.join(directory, "jobs.sqlite3"), "wb") as f:
+            f.write(b"x" * 50)
+        with open(os.path.join(directory, "antigo.pdf"), "wb") as f:
+            f.write(b"x" * 20)
+
+        store = _store(directory)
+
+        assert store.stats()["files"] == 1
+        assert store.stats()["bytes"] == 20
+
+
+if __name__ == "__main__":
+    test_sweep_por_idade()
+    test_sweep_por_tamanho_lru()
+    test_sweep_respeita_carencia()
+    test_scan_ignora_arquivos_nao_gerenciados()
+    print("✅ TempFileStore: todos os testes passaram")